@@ -0,0 +1,212 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and Contributors
+# MIT License. See license.txt
+
+import hashlib
+import re
+from contextlib import contextmanager
+
+import frappe
+import requests
+from werkzeug.http import http_date, quote_etag
+from werkzeug.wrappers import Response
+
+VERSION_PREFIX = "wiki_cache_version:"
+
+SETTINGS = "settings"
+SPACES = "spaces"
+SIDEBAR = "sidebar"
+# Website Settings, the theme and anything else rendered around a page
+WEBSITE = "website"
+
+# `wiki_purge_endpoint` in site config set to this records purges instead of sending them
+LOCAL_PURGE_ENDPOINT = "local"
+PURGE_LOG = "wiki_purge_log"
+DEFAULT_SURROGATE_TTL = 6 * 60 * 60
+
+
+def space_key(space: str) -> str:
+	return f"space:{space}"
+
+
+def page_key(page: str) -> str:
+	return f"page:{page}"
+
+
+def get_cache_versions(*keys: str) -> list[int]:
+	"""Current version of each key, versions only ever go up and start at 0"""
+	values = frappe.cache.mget([frappe.cache.make_key(f"{VERSION_PREFIX}{key}") for key in keys])
+	return [int(value or 0) for value in values]
+
+
+def bump_cache_version(*keys: str):
+	"""Invalidate everything derived from `keys`, including copies held by an upstream HTTP cache"""
+	if deferred := frappe.flags.wiki_deferred_invalidation:
+		deferred.keys.update(keys)
+		return
+
+	pipeline = frappe.cache.pipeline()
+	for key in keys:
+		pipeline.incr(frappe.cache.make_key(f"{VERSION_PREFIX}{key}"))
+	pipeline.execute()
+
+	if frappe.conf.wiki_purge_endpoint:
+		frappe.enqueue(
+			purge_surrogate_keys,
+			keys=get_surrogate_keys(*keys),
+			enqueue_after_commit=True,
+			now=frappe.flags.in_test,
+		)
+
+
+def bump_website_version(*args, **kwargs):
+	"""Website Settings hook, rendered pages carry the navbar, footer and theme"""
+	bump_cache_version(WEBSITE)
+
+
+def clear_website_cache(path=None):
+	"""`website_clear_cache` hook, only clearing the whole website cache touches every page"""
+	if not path:
+		bump_cache_version(WEBSITE)
+
+
+def run_deferred(key, method, *args):
+	"""
+	Run `method` now, or once at the end of the `defer_invalidation` block
+	however many times it is asked for with the same `key`
+	"""
+	if deferred := frappe.flags.wiki_deferred_invalidation:
+		deferred.methods.setdefault(key, (method, args))
+		return
+
+	method(*args)
+
+
+@contextmanager
+def defer_invalidation():
+	"""
+	Batch the invalidation done by many document updates, such as approving a
+	batch of patches: cache versions are bumped and deferred methods run once
+	each when the block ends, instead of once per document.
+	"""
+	if frappe.flags.wiki_deferred_invalidation:
+		yield
+		return
+
+	deferred = frappe.flags.wiki_deferred_invalidation = frappe._dict(keys=set(), methods={})
+	try:
+		yield
+	finally:
+		frappe.flags.wiki_deferred_invalidation = None
+		if deferred.keys:
+			bump_cache_version(*deferred.keys)
+		for method, args in deferred.methods.values():
+			method(*args)
+
+
+def get_surrogate_keys(*keys: str) -> list[str]:
+	return [re.sub(r"[^\w-]", "-", f"wiki-{key}") for key in keys]
+
+
+def get_page_surrogate_keys(page: str, space: str | None) -> list[str]:
+	"""Everything a rendered page depends on, see `bump_cache_version`"""
+	keys = [SETTINGS, SIDEBAR, WEBSITE, page_key(page)]
+	if space:
+		keys.append(space_key(space))
+
+	return get_surrogate_keys(*keys)
+
+
+def get_space_surrogate_keys(space: str) -> list[str]:
+	return get_surrogate_keys(SETTINGS, SIDEBAR, space_key(space))
+
+
+def get_shared_cache_headers(surrogate_keys: list[str]) -> dict:
+	"""Headers letting an upstream cache keep guest pages until they are purged"""
+	ttl = frappe.conf.wiki_surrogate_ttl or DEFAULT_SURROGATE_TTL
+	return {
+		"Cache-Control": f"public, max-age=0, must-revalidate, s-maxage={ttl}",
+		"Surrogate-Control": f"max-age={ttl}",
+		"Surrogate-Key": " ".join(surrogate_keys),
+	}
+
+
+def purge_surrogate_keys(keys: list[str]):
+	endpoint = frappe.conf.wiki_purge_endpoint
+	if not endpoint or not keys:
+		return
+
+	if endpoint == LOCAL_PURGE_ENDPOINT:
+		# the list helpers of `frappe.cache` prefix keys themselves and push one value at a time
+		pipeline = frappe.cache.pipeline()
+		pipeline.rpush(frappe.cache.make_key(PURGE_LOG), *keys)
+		pipeline.ltrim(frappe.cache.make_key(PURGE_LOG), -1000, -1)
+		pipeline.execute()
+		return
+
+	headers = {"Surrogate-Key": " ".join(keys)}
+	if token := frappe.conf.wiki_purge_token:
+		headers["Authorization"] = f"Bearer {token}"
+
+	try:
+		response = requests.request(
+			frappe.conf.wiki_purge_method or "PURGE", endpoint, headers=headers, timeout=5
+		)
+		response.raise_for_status()
+	except requests.RequestException:
+		frappe.log_error(f"Purging surrogate keys {keys} failed")
+
+
+def get_purge_log() -> list[str]:
+	"""Keys purged through the local stand-in endpoint, oldest first"""
+	return [key.decode() for key in frappe.cache.lrange(PURGE_LOG, 0, -1)]
+
+
+def get_etag(*parts) -> str:
+	return hashlib.sha1(":".join(str(part) for part in parts).encode()).hexdigest()
+
+
+def get_page_etag(wiki_page, space: str | None, *extra) -> str:
+	"""
+	Strong ETag for a Wiki Page, changes with the page itself, with the
+	sidebar of its space (titles and order of neighbours) and with Wiki Settings
+	"""
+	versions = get_cache_versions(SETTINGS, SIDEBAR, space_key(space or ""))
+	return get_etag(wiki_page.name, wiki_page.modified, *versions, *extra)
+
+
+def get_space_etag(space: str, *extra) -> str:
+	"""Strong ETag for anything derived from the sidebar of `space` alone"""
+	versions = get_cache_versions(SETTINGS, SIDEBAR, space_key(space))
+	return get_etag(space, *versions, *extra)
+
+
+def get_validator_headers(etag: str, last_modified=None) -> dict:
+	headers = {
+		"ETag": quote_etag(etag),
+		# let browsers keep the payload, but always revalidate
+		"Cache-Control": "no-cache",
+	}
+	if last_modified:
+		headers["Last-Modified"] = http_date(frappe.utils.get_datetime(last_modified).replace(microsecond=0))
+
+	return headers
+
+
+def is_not_modified(etag: str, last_modified=None) -> bool:
+	"""Check the conditional headers of the current request, If-None-Match wins over If-Modified-Since"""
+	request = getattr(frappe.local, "request", None)
+	if not request or request.method not in ("GET", "HEAD"):
+		return False
+
+	if request.if_none_match:
+		return request.if_none_match.contains(etag)
+
+	if request.if_modified_since and last_modified:
+		modified = frappe.utils.get_datetime(last_modified).replace(microsecond=0)
+		return modified <= request.if_modified_since.replace(tzinfo=None)
+
+	return False
+
+
+def not_modified_response(headers: dict) -> Response:
+	return Response(status=304, headers=headers)
@@ -0,0 +1,33 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and Contributors
+# MIT License. See license.txt
+
+import click
+import frappe
+from frappe.commands import get_site, pass_context
+
+
+@click.command("export-wiki-space")
+@click.argument("space")
+@click.argument("target")
+@click.option("--skip-assets", is_flag=True, default=False, help="Don't copy built assets and files")
+@click.option("--force", is_flag=True, default=False, help="Rewrite every page, even unchanged ones")
+@pass_context
+def export_wiki_space(context, space, target, skip_assets=False, force=False):
+	"""Export a Wiki Space (by name or route) as a static site into TARGET"""
+	from wiki.wiki.doctype.wiki_space.static_export import export_wiki_space
+
+	site = get_site(context)
+	frappe.init(site=site)
+	frappe.connect()
+
+	try:
+		stats = export_wiki_space(space, target, include_assets=not skip_assets, force=force)
+	finally:
+		frappe.destroy()
+
+	click.echo(
+		f"\nExported {space}: {stats.written} written, {stats.unchanged} unchanged, {stats.removed} removed"
+	)
+
+
+commands = [export_wiki_space]
@@ -75,7 +75,11 @@ website_route_rules = [
 # before_install = "wiki.install.before_install"
 after_install = "wiki.install.after_install"
 
-after_migrate = ["wiki.wiki.doctype.wiki_page.search.build_index_in_background"]
+after_migrate = [
+	"wiki.wiki.doctype.wiki_page.search.build_index_in_background",
+	"wiki.wiki.doctype.wiki_page_artifact.wiki_page_artifact.backfill_artifacts_in_background",
+	"wiki.wiki.doctype.wiki_page.cache_warmup.warm_cache_in_background",
+]
 
 # Desk Notifications
 # ------------------
@@ -107,6 +111,14 @@ after_migrate = ["wiki.wiki.doctype.wiki_page.search.build_index_in_background"]
 # ---------------
 # Hook on document methods and events
 
+doc_events = {
+	"Website Settings": {
+		"on_update": "wiki.cache.bump_website_version",
+	},
+}
+
+website_clear_cache = "wiki.cache.clear_website_cache"
+
 # doc_events = {
 # 	"*": {
 # 		"on_update": "method",
@@ -122,6 +134,10 @@ scheduler_events = {
 	"cron": {
 		"*/15 * * * *": ["wiki.wiki.doctype.wiki_page.search.build_index_in_background"],
 	},
+	"daily": [
+		"wiki.wiki.doctype.wiki_page_patch.counters.reconcile_patch_counters",
+		"wiki.wiki.doctype.wiki_page_revision.wiki_page_revision.delete_orphan_revisions",
+	],
 }
 
 # scheduler_events = {
@@ -205,6 +205,10 @@ function saveWikiPage(draft = false) {
     callback: (r) => {
       // Clear draft from localStorage after successful save
       localStorage.removeItem(getDraftKey());
+      if (r.message.apply_status === "Queued") {
+        waitForPatch(r.message.patch);
+        return;
+      }
       // route back to the main page
       window.location.href = "/" + r.message.route;
     },
@@ -212,6 +216,37 @@ function saveWikiPage(draft = false) {
   });
 }
 
+// approved changes are applied in the background, wait for them before leaving the editor
+function waitForPatch(patch) {
+  frappe.freeze(__("Publishing changes..."));
+  const poll = () => {
+    frappe.call({
+      method:
+        "wiki.wiki.doctype.wiki_page_patch.wiki_page_patch.get_apply_status",
+      args: { patch },
+      callback: (r) => {
+        if (r.message.status === "Queued") {
+          setTimeout(poll, 1000);
+          return;
+        }
+
+        frappe.unfreeze();
+        if (r.message.status === "Failed") {
+          frappe.msgprint({
+            title: __("Could not publish changes"),
+            message: r.message.error,
+            indicator: "red",
+          });
+          return;
+        }
+        window.location.href = "/" + r.message.route;
+      },
+      error: () => frappe.unfreeze(),
+    });
+  };
+  poll();
+}
+
 saveWikiPageBtn.addEventListener("click", () => {
   saveWikiPage();
 });
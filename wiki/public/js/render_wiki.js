@@ -100,7 +100,6 @@ window.RenderWiki = class RenderWiki extends Wiki {
         this.add_link_to_headings();
         this.activate_sidebars();
         this.set_active_sidebar();
-        this.set_nav_buttons();
         this.set_toc();
         this.set_last_updated_date();
         this.scrolltotop();
@@ -124,6 +123,8 @@ window.RenderWiki = class RenderWiki extends Wiki {
       toggleEditor();
     } else if (urlParams.get("newWiki")) {
       toggleEditor();
+      // a new page is saved along with the whole sidebar
+      Wiki.load_sidebar_groups();
 
       if (
         !$(
@@ -152,37 +153,6 @@ window.RenderWiki = class RenderWiki extends Wiki {
     }
   }
 
-  set_nav_buttons() {
-    var current_index = -1;
-    const sidebar_items = $(".sidebar-column").find("a").not(".navbar-brand");
-
-    sidebar_items.each(function (index) {
-      if ($(this).attr("class")) {
-        const hasActiveClass = $(this)
-          .attr("class")
-          .split(/\s+/)
-          .includes("active");
-        if (hasActiveClass) {
-          current_index = index;
-        }
-      }
-    });
-
-    if (current_index > 0) {
-      $(".btn.left")[0].href = sidebar_items[current_index - 1].href;
-      $($(".btn.left p")[1]).text(sidebar_items[current_index - 1].innerText);
-    } else {
-      $(".btn.left").addClass("hide");
-    }
-
-    if (current_index >= 0 && current_index < sidebar_items.length - 1) {
-      $(".btn.right")[0].href = sidebar_items[current_index + 1].href;
-      $($(".btn.right p")[1]).text(sidebar_items[current_index + 1].innerText);
-    } else {
-      $(".btn.right").addClass("hide");
-    }
-  }
-
   set_edit_mode() {
     $(".sidebar-item, .sidebar-group").addClass("non-draggable");
 
@@ -209,7 +179,8 @@ window.RenderWiki = class RenderWiki extends Wiki {
             `/login?redirect-to=${window.location.pathname}`,
           );
         } else {
-          toggleSidebarEditor();
+          // the whole sidebar is saved on every change, so every group needs its pages
+          Wiki.load_sidebar_groups().then(toggleSidebarEditor);
         }
       },
     );
@@ -573,39 +544,47 @@ window.RenderWiki = class RenderWiki extends Wiki {
           return;
         }
 
-        frappe
-          .call({
-            method: "wiki.wiki.doctype.wiki_page.search.search",
-            args: {
-              query: searchInput.val(),
-              path: window.location.pathname,
-              space: search_scope,
-            },
-          })
-          .then((res) => {
-            let results = res.message.docs || [];
-            let dropdown_html = `<div style="margin: 0.8rem;text-align: center;">No results found</div>`;
-            if (results.length > 0) {
-              dropdown_html = results
-                .map((r) => {
-                  let content = r.content;
-                  if (content.startsWith("...")) content = content.slice(3);
-                  if (res.message.search_engine === "redisearch")
-                    content = trimContent(content);
-
-                  return `<a class="dropdown-item" href="/${r.route}">
+        // static exports search the bundle written next to the pages
+        const searchBundle = $('meta[name="wiki-static-export"]').attr(
+          "content",
+        );
+        const search = searchBundle
+          ? searchStaticBundle(searchBundle, searchInput.val()).then(
+              (message) => ({ message }),
+            )
+          : frappe.call({
+              method: "wiki.wiki.doctype.wiki_page.search.search",
+              args: {
+                query: searchInput.val(),
+                path: window.location.pathname,
+                space: search_scope,
+              },
+            });
+
+        search.then((res) => {
+          let results = res.message.docs || [];
+          let dropdown_html = `<div style="margin: 0.8rem;text-align: center;">No results found</div>`;
+          if (results.length > 0) {
+            dropdown_html = results
+              .map((r) => {
+                let content = r.content;
+                if (content.startsWith("...")) content = content.slice(3);
+                if (res.message.search_engine === "redisearch")
+                  content = trimContent(content);
+
+                return `<a class="dropdown-item" href="/${r.route}">
               <span class="result-title">${r.title}</span>
               <div class="result-text">${content}</div>
               </a>
               <div class='dropdown-border'></div>`;
-                })
-                .join("");
-            }
+              })
+              .join("");
+          }
 
-            $dropdown_menu.html(dropdown_html);
-            $dropdown_menu.addClass("show");
-            dropdownItems = $dropdown_menu.find(".dropdown-item");
-          });
+          $dropdown_menu.html(dropdown_html);
+          $dropdown_menu.addClass("show");
+          dropdownItems = $dropdown_menu.find(".dropdown-item");
+        });
       }, 100),
     );
 
@@ -732,3 +711,55 @@ window.RenderWiki = class RenderWiki extends Wiki {
     });
   }
 };
+
+let staticSearchBundle = null;
+const STATIC_SEARCH_LIMIT = 20;
+
+// Search the `search.json` bundle of a static export in the browser, results
+// are shaped like the ones of `wiki.wiki.doctype.wiki_page.search.search`
+function searchStaticBundle(url, query) {
+  staticSearchBundle =
+    staticSearchBundle ||
+    fetch(url)
+      .then((response) => (response.ok ? response.json() : []))
+      .catch(() => []);
+
+  const words = query.toLowerCase().split(/\s+/).filter(Boolean);
+
+  return staticSearchBundle.then((pages) => {
+    const docs = pages
+      .filter((page) => {
+        const text = `${page.title} ${page.content}`.toLowerCase();
+        return words.every((word) => text.includes(word));
+      })
+      .map((page) => ({
+        page,
+        in_title: words.every((word) => page.title.toLowerCase().includes(word)),
+      }))
+      .sort((a, b) => b.in_title - a.in_title)
+      .slice(0, STATIC_SEARCH_LIMIT)
+      .map(({ page }) => ({
+        title: escapeHtml(page.title),
+        route: page.route,
+        content: getSearchSnippet(page.content || "", words[0]),
+      }));
+
+    return { docs, search_engine: "static_export" };
+  });
+}
+
+function getSearchSnippet(content, word) {
+  const index = content.toLowerCase().indexOf(word);
+  if (index === -1) return escapeHtml(content.slice(0, 100));
+
+  const start = Math.max(index - 50, 0);
+  return (
+    escapeHtml(content.slice(start, index)) +
+    `<b class="match">${escapeHtml(content.slice(index, index + word.length))}</b>` +
+    escapeHtml(content.slice(index + word.length, index + 50))
+  );
+}
+
+function escapeHtml(text) {
+  return $("<div>").text(text).html();
+}
@@ -1,3 +1,7 @@
+// Pages of a static export (see `export_wiki_space`) have no API to fetch
+// pages from, links to other pages are followed with full page loads
+const isStaticExport = $('meta[name="wiki-static-export"]').length > 0;
+
 function add_link_to_headings() {
   $(".from-markdown")
     .not(".revision-content")
@@ -125,8 +129,8 @@ function toggleEditor() {
 }
 
 window.Wiki = class Wiki {
-  activate_sidebars() {
-    $(".sidebar-item").each(function (index) {
+  activate_sidebars($items = $(".sidebar-item")) {
+    $items.each(function (index) {
       const active_class = "active";
       let page_href = decodeURIComponent(window.location.pathname.slice(1));
       if (page_href.indexOf("#") !== -1) {
@@ -149,6 +153,8 @@ window.Wiki = class Wiki {
         .find("a")
         // For iPad, touchstart listener is needed to recognize click.
         .on("click touchstart", (e) => {
+          if (isStaticExport) return;
+
           e.preventDefault();
           const href = $(e.currentTarget).attr("href");
           const urlParams = new URLSearchParams(window.location.search);
@@ -177,11 +183,42 @@ window.Wiki = class Wiki {
   }
 
   toggle_sidebar(event) {
-    $(event.currentTarget).parent().children("ul").toggleClass("hidden");
+    const $list = $(event.currentTarget).parent().children("ul");
+    $list.toggleClass("hidden");
     $(event.currentTarget).find(".icon").toggleClass("rotate");
+    Wiki.load_sidebar_groups($list.filter("[data-lazy]"));
     event.stopPropagation();
   }
 
+  // With "Lazy Load Sidebar Groups" only the open group comes with its pages,
+  // the pages of the others are fetched the first time they are needed
+  static load_sidebar_groups(
+    $lists = $(".web-sidebar .sidebar-group-item-list[data-lazy]"),
+  ) {
+    return Promise.all(
+      $lists.toArray().map((list) => {
+        const $list = $(list).removeAttr("data-lazy");
+        const params = new URLSearchParams({
+          space: $list.closest(".web-sidebar").data("space"),
+          group: $list.closest(".sidebar-group").data("title"),
+        });
+
+        return fetch(
+          `/api/method/wiki.wiki.doctype.wiki_page.sidebar.get_sidebar_group?${params}`,
+          { headers: { Accept: "application/json" } },
+        )
+          .then((response) => (response.ok ? response.json() : {}))
+          .then((r) => {
+            const $items = $(r.message || "")
+              .filter(".sidebar-item")
+              .addClass("non-draggable");
+            $list.append($items);
+            Wiki.prototype.activate_sidebars($items);
+          });
+      }),
+    );
+  }
+
   set_active_sidebar() {
     $(".doc-sidebar,.web-sidebar").on(
       "click",
@@ -312,63 +349,166 @@ function loadWikiPage(url, pageElement, replaceState = false) {
   // Save wiki page name on input used by editor.js and render_wiki.js
   $('[name="wiki-page-name"]').val(wikiPageName);
 
-  frappe.call({
-    method: "wiki.wiki.doctype.wiki_page.wiki_page.get_page_content",
-    args: { wiki_page_name: pageName },
-    callback: (r) => {
-      if (r.message) {
-        $(".wiki-content").html(r.message.content);
-
-        $(".wiki-title").html(r.message.title);
-
-        $("title").text(r.message.title);
-
-        if (r.message.toc_html) {
-          $(".page-toc .list-unstyled").html(r.message.toc_html);
-        }
-
-        // Update active sidebar item
-        $(".sidebar-item").removeClass("active");
-        $(".sidebar-item").find("a").removeClass("active");
-        $(pageElement).closest(".sidebar-item").addClass("active");
-        $(pageElement).addClass("active");
-
-        let nextPage = r.message.next_page;
-        let prevPage = r.message.prev_page;
-
-        if (nextPage) {
-          $(".footer-next-page-link")
-            .removeClass("hide")
-            .attr("href", `/${nextPage.route}`);
-          $(".footer-next-page").text(nextPage.title);
-        } else {
-          $(".footer-next-page-link").addClass("hide");
-        }
-
-        if (prevPage) {
-          $(".footer-prev-page-link")
-            .removeClass("hide")
-            .attr("href", `/${prevPage.route}`);
-          $(".footer-prev-page").text(prevPage.title);
-        } else {
-          $(".footer-prev-page-link").addClass("hide");
-        }
-
-        // Re-initialize necessary components
-        add_link_to_headings();
-        add_click_to_copy();
-        set_toc();
-        hljs.configure({
-          languages: ["python", "html", "css", "javascript", "shell", "bash"],
-        });
-        hljs.highlightAll();
+  getPageContent(pageName).then((page) => {
+    if (page) {
+      $(".wiki-content").html(page.content);
+
+      $(".wiki-title").html(page.title);
+
+      $("title").text(page.title);
+
+      if (page.toc_html) {
+        $(".page-toc .list-unstyled").html(page.toc_html);
       }
-      $(".main-column, .page-toc").toggleClass("pulse");
-    },
+
+      // Update active sidebar item
+      $(".sidebar-item").removeClass("active");
+      $(".sidebar-item").find("a").removeClass("active");
+      $(pageElement).closest(".sidebar-item").addClass("active");
+      $(pageElement).addClass("active");
+
+      let nextPage = page.next_page;
+      let prevPage = page.prev_page;
+
+      if (nextPage) {
+        $(".footer-next-page-link")
+          .removeClass("hide")
+          .attr("href", `/${nextPage.route}`)
+          .attr("data-name", nextPage.name);
+        $(".footer-next-page").text(nextPage.title);
+      } else {
+        $(".footer-next-page-link").addClass("hide");
+      }
+
+      if (prevPage) {
+        $(".footer-prev-page-link")
+          .removeClass("hide")
+          .attr("href", `/${prevPage.route}`)
+          .attr("data-name", prevPage.name);
+        $(".footer-prev-page").text(prevPage.title);
+      } else {
+        $(".footer-prev-page-link").addClass("hide");
+      }
+
+      // Re-initialize necessary components
+      add_link_to_headings();
+      add_click_to_copy();
+      set_toc();
+      hljs.configure({
+        languages: ["python", "html", "css", "javascript", "shell", "bash"],
+      });
+      hljs.highlightAll();
+
+      prefetchNeighbours();
+    }
+    $(".main-column, .page-toc").toggleClass("pulse");
   });
 }
 
+// Pages fetched ahead of a click, by name. Entries are promises so that a
+// click on a page that is still being prefetched waits for that request.
+const prefetchedPages = new Map();
+const PREFETCH_TTL = 5 * 60 * 1000;
+const PREFETCH_BATCH_SIZE = 20;
+let prefetchQueue = new Set();
+let prefetchTimeout = null;
+
+function getPrefetchedPage(pageName) {
+  const entry = prefetchedPages.get(pageName);
+  if (entry && Date.now() - entry.time < PREFETCH_TTL) {
+    return entry.page;
+  }
+  prefetchedPages.delete(pageName);
+}
+
+function getPageContent(pageName) {
+  const prefetched = getPrefetchedPage(pageName);
+
+  // pages that couldn't be prefetched are fetched on their own
+  return (prefetched || Promise.resolve()).then((page) => {
+    if (page) return page;
+
+    prefetchedPages.delete(pageName);
+    // Plain GET, so the browser revalidates pages it has already seen with
+    // If-None-Match and reuses its copy on a 304
+    return fetch(
+      `/api/method/wiki.wiki.doctype.wiki_page.wiki_page.get_page_content?${new URLSearchParams({ wiki_page_name: pageName })}`,
+      { headers: { Accept: "application/json" } },
+    )
+      .then((response) => (response.ok ? response.json() : {}))
+      .then((r) => r.message);
+  });
+}
+
+function prefetchPages(pageNames) {
+  if (isStaticExport) return;
+
+  pageNames
+    .filter((name) => name && name !== wikiPageName && !getPrefetchedPage(name))
+    .forEach((name) => prefetchQueue.add(name));
+
+  // hovering over several items in a row ends up in one request
+  clearTimeout(prefetchTimeout);
+  prefetchTimeout = setTimeout(() => {
+    const names = [...prefetchQueue].slice(0, PREFETCH_BATCH_SIZE);
+    prefetchQueue = new Set();
+    if (!names.length) return;
+
+    const pages = fetch(
+      `/api/method/wiki.wiki.doctype.wiki_page.wiki_page.get_pages_content?${new URLSearchParams({ wiki_page_names: JSON.stringify(names) })}`,
+      { headers: { Accept: "application/json" } },
+    )
+      .then((response) => (response.ok ? response.json() : {}))
+      .then((r) => r.message || {})
+      .catch(() => ({}));
+
+    names.forEach((name) =>
+      prefetchedPages.set(name, {
+        page: pages.then((pages) => pages[name]),
+        time: Date.now(),
+      }),
+    );
+  }, 100);
+}
+
+function prefetchNeighbours() {
+  prefetchPages(
+    $(".footer-prev-page-link, .footer-next-page-link")
+      .not(".hide")
+      .toArray()
+      .map((link) => $(link).attr("data-name")),
+  );
+}
+
+$(document).ready(() => {
+  prefetchNeighbours();
+
+  $(".doc-sidebar").on("mouseenter", ".sidebar-item a", (e) => {
+    prefetchPages([$(e.currentTarget).closest(".sidebar-item").data("name")]);
+  });
+
+  // next/prev open in place when their page is on the sidebar
+  $(".wiki-footer").on(
+    "click",
+    ".footer-prev-page-link, .footer-next-page-link",
+    (e) => {
+      if (isStaticExport) return;
+
+      const pageElement = $(
+        `.doc-sidebar .sidebar-item[data-name="${$(e.currentTarget).attr("data-name")}"] a`,
+      )[0];
+      if (!pageElement || e.metaKey || e.ctrlKey) return;
+
+      e.preventDefault();
+      loadWikiPage($(e.currentTarget).attr("href"), pageElement);
+      $("html, body").animate({ scrollTop: 0 }, 100);
+    },
+  );
+});
+
 window.addEventListener("popstate", function (event) {
+  if (isStaticExport) return;
+
   // Don't process if it's just a hash change
   const hasHashFragment = window.location.hash.length > 0;
   if (hasHashFragment) {
@@ -0,0 +1,126 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and Contributors
+# MIT License. See license.txt
+
+"""
+Per worker snapshot of Wiki Settings and of the metadata of every Wiki Space
+(route, logos, navbar), read on every page render and search.
+
+The snapshot is rebuilt when the `settings` or `spaces` cache versions in
+Redis move, which costs one Redis read per request instead of a handful of
+database queries. It is shared by every request the worker serves, so it is
+read only.
+"""
+
+import frappe
+from frappe.website.doctype.website_settings.website_settings import modify_header_footer_items
+
+from wiki.cache import SETTINGS, SPACES, get_cache_versions
+
+SPACE_FIELDS = (
+	"name",
+	"route",
+	"space_name",
+	"light_mode_logo",
+	"dark_mode_logo",
+	"app_switcher_logo",
+	"favicon",
+)
+
+# site -> (versions, snapshot)
+_snapshots = {}
+
+
+class ReadOnlyDict(frappe._dict):
+	def __setitem__(self, key, value):
+		raise TypeError("Wiki snapshot is read only")
+
+	__setattr__ = __setitem__
+	__delitem__ = __setitem__
+	__delattr__ = __setitem__
+
+
+def freeze(value):
+	if isinstance(value, dict):
+		return ReadOnlyDict({key: freeze(v) for key, v in value.items()})
+
+	if isinstance(value, list | tuple):
+		return tuple(freeze(v) for v in value)
+
+	return value
+
+
+class WikiSnapshot:
+	__slots__ = ("routes", "settings", "spaces")
+
+	def __init__(self, settings: dict, spaces: list[dict]):
+		object.__setattr__(self, "settings", freeze(settings))
+		object.__setattr__(self, "spaces", freeze({space["name"]: space for space in spaces}))
+		object.__setattr__(self, "routes", freeze({space["route"]: space["name"] for space in spaces}))
+
+	def __setattr__(self, name, value):
+		raise TypeError("Wiki snapshot is read only")
+
+	def get_space(self, name: str | None) -> ReadOnlyDict:
+		return self.spaces.get(name) or ReadOnlyDict()
+
+	def get_space_route(self, path: str | None) -> str | None:
+		"""Route of the space `path` belongs to, the longest matching route wins for nested spaces"""
+		segments = (path or "").strip("/").split("/")
+		for end in range(len(segments), 0, -1):
+			route = "/".join(segments[:end])
+			if route in self.routes:
+				return route
+
+	def get_navbar_items(self, space: str | None) -> list[dict]:
+		items = self.get_space(space).navbar_items or self.settings.navbar or ()
+		# `modify_header_footer_items` nests child items into their parents in place
+		return modify_header_footer_items([frappe._dict(item) for item in items])
+
+	def get_app_switcher_spaces(self) -> list[ReadOnlyDict]:
+		return [
+			self.spaces[entry.wiki_space]
+			for entry in self.settings.app_switcher_list or ()
+			if entry.wiki_space in self.spaces
+		]
+
+
+def get_wiki_snapshot() -> WikiSnapshot:
+	"""Snapshot of Wiki Settings and Wiki Spaces, checked against Redis once per request"""
+	if snapshot := getattr(frappe.local, "wiki_snapshot", None):
+		return snapshot
+
+	versions = tuple(get_cache_versions(SETTINGS, SPACES))
+	cached = _snapshots.get(frappe.local.site)
+	if cached and cached[0] == versions:
+		snapshot = cached[1]
+	else:
+		snapshot = build_snapshot()
+		_snapshots[frappe.local.site] = (versions, snapshot)
+
+	frappe.local.wiki_snapshot = snapshot
+	return snapshot
+
+
+def build_snapshot() -> WikiSnapshot:
+	settings = frappe.get_single("Wiki Settings").as_dict(no_default_fields=True)
+
+	spaces = frappe.get_all("Wiki Space", fields=list(SPACE_FIELDS))
+	navbar_items = {}
+	for item in frappe.get_all(
+		"Top Bar Item",
+		filters={"parenttype": "Wiki Space", "parentfield": "navbar_items"},
+		fields=["*"],
+		order_by="idx asc",
+	):
+		navbar_items.setdefault(item.pop("parent"), []).append(item)
+
+	for space in spaces:
+		space.navbar_items = navbar_items.get(space.name, [])
+
+	return WikiSnapshot(settings, spaces)
+
+
+def clear_wiki_snapshot():
+	"""Drop the snapshot of this request, other workers notice the version bump"""
+	frappe.local.wiki_snapshot = None
+	_snapshots.pop(getattr(frappe.local, "site", None), None)
@@ -1,6 +1,9 @@
-import difflib
+import bisect
+import re
+from html import escape
 
 import frappe
+from frappe.utils import cint
 
 
 def check_app_permission():
@@ -16,143 +19,407 @@ def check_app_permission():
 	return False
 
 
-def apply_markdown_diff(original_md, modified_md):
+def get_patch_listing(conditions, cursor=None, limit=10, fields=()):
 	"""
-	Compares two markdown texts, finds the differences, and applies them to the original text.
+	Wiki Page Patches matching `conditions`, newest first, with the route of
+	their page and the name of its space joined in one query. Pages are read
+	with a keyset cursor on (modified, name) instead of an offset, so later
+	pages cost the same as the first one.
 
 	Args:
-				original_md (str): The original markdown text.
-				modified_md (str): The modified markdown text.
+				conditions (list): frappe.qb criteria on the `Wiki Page Patch` table.
+				cursor (str): `next_cursor` of the previous page, if any.
+				limit (int): Number of patches per page.
+				fields (tuple): Extra fields of Wiki Page Patch to select.
 
 	Returns:
-				tuple: A tuple containing the updated markdown text and a list of changes with their positions.
+				tuple: The patches and the cursor of the next page, None on the last page.
 	"""
-	original_lines = original_md.split("\n")
-	modified_lines = modified_md.split("\n")
-
-	# Initialize the SequenceMatcher to compare the two lists of lines
-	matcher = difflib.SequenceMatcher(None, original_lines, modified_lines)
-	opcodes = matcher.get_opcodes()
-
-	# Sort opcodes by the reverse order of the original start index to handle index shifting
-	sorted_opcodes = sorted(opcodes, key=lambda x: (-x[1], x[0]))
-
-	# Create a copy of the original lines to apply changes
-	result = list(original_lines)
-	changes = []
-
-	for tag, i1, i2, j1, j2 in sorted_opcodes:
-		# Convert original line indices to 1-based for reporting
-		original_range = None
-		if i1 < i2:
-			original_start = i1 + 1
-			original_end = i2
-			original_range = (original_start, original_end)
-
-		if tag == "delete":
-			# Record the deletion change
-			changes.append({"type": "delete", "original_lines": original_range, "content": None})
-			# Apply deletion to the result
-			del result[i1:i2]
-		elif tag == "insert":
-			# Record the insertion change with position (1-based)
-			content = modified_lines[j1:j2]
-			position = i1 + 1  # Convert to 1-based position
-			changes.append(
-				{"type": "insert", "original_lines": None, "content": content, "position": position}
-			)
-			# Apply insertion to the result
-			result[i1:i1] = content
-		elif tag == "replace":
-			# Record the replacement change
-			content = modified_lines[j1:j2]
-			changes.append({"type": "replace", "original_lines": original_range, "content": content})
-			# Apply replacement: delete original lines and insert new content
-			del result[i1:i2]
-			result[i1:i1] = content
-		# 'equal' changes are ignored
-
-	# Join the modified lines back into a single string
-	updated_md = "\n".join(result)
-	return updated_md, changes
-
-
-def apply_changes(original_md, changes):
+	from frappe.query_builder import Order
+
+	patch = frappe.qb.DocType("Wiki Page Patch")
+	page = frappe.qb.DocType("Wiki Page")
+	item = frappe.qb.DocType("Wiki Group Item")
+	space = frappe.qb.DocType("Wiki Space")
+	limit = cint(limit) or 10
+
+	query = (
+		frappe.qb.from_(patch)
+		.left_join(page)
+		.on(page.name == patch.wiki_page)
+		.left_join(item)
+		.on((item.wiki_page == patch.wiki_page) & (item.parenttype == "Wiki Space"))
+		.left_join(space)
+		.on(space.name == item.parent)
+		.select(
+			patch.name,
+			patch.message,
+			patch.status,
+			patch.raised_by,
+			patch.modified,
+			patch.wiki_page,
+			patch.new,
+			*(patch[field] for field in fields),
+			page.route,
+			item.parent.as_("space"),
+			space.space_name,
+		)
+		.orderby(patch.modified, order=Order.desc)
+		.orderby(patch.name, order=Order.desc)
+		.limit(limit)
+	)
+
+	for condition in conditions:
+		query = query.where(condition)
+
+	if cursor:
+		modified, name = cursor.split("|", 1)
+		query = query.where(
+			(patch.modified < modified) | ((patch.modified == modified) & (patch.name < name))
+		)
+
+	patches = query.run(as_dict=True)
+
+	next_cursor = None
+	if len(patches) == limit:
+		next_cursor = f"{patches[-1].modified}|{patches[-1].name}"
+
+	return patches, next_cursor
+
+
+# Gaps without lines unique to both sides are diffed with Myers' algorithm,
+# which needs O(D^2) memory for D edits. Past this many edits the gap is
+# treated as replaced as a whole.
+MAX_MYERS_EDITS = 2000
+
+
+def diff_lines(a, b):
 	"""
-	Applies a list of changes to the original markdown text.
+	Finds the lines `a` and `b` have in common with a patience diff: lines that
+	occur exactly once on both sides anchor the diff, the gaps between anchors
+	are diffed the same way and, when they have no unique lines, with Myers'
+	algorithm. Unlike difflib this stays close to linear on pages with many
+	repeated lines, such as tables and code blocks.
 
 	Args:
-				original_md (str): The original markdown text.
-				changes (list): A list of changes as returned by apply_markdown_diff.
+				a (list): Lines of the old text.
+				b (list): Lines of the new text.
 
 	Returns:
-				str: The modified markdown text after applying all changes.
+				list: Matching blocks `(i, j, size)`, meaning a[i:i + size] == b[j:j + size], in order.
 	"""
-	lines = original_md.split("\n")
+	blocks = []
+	# work items are popped from the end, so ranges are pushed in reverse order
+	stack = [("range", 0, len(a), 0, len(b))]
 
-	# Sort changes in reverse order of their original line numbers to handle index shifting
-	sorted_changes = sorted(
-		changes, key=lambda x: (-x["original_lines"][0] if x["original_lines"] else -x["position"])
-	)
+	while stack:
+		item = stack.pop()
+		if item[0] == "block":
+			_add_block(blocks, *item[1:])
+			continue
 
-	for change in sorted_changes:
-		if change["type"] == "delete":
-			start = change["original_lines"][0] - 1  # Convert to 0-based index
-			end = change["original_lines"][1]
-			del lines[start:end]
-		elif change["type"] == "insert":
-			position = change["position"] - 1  # Convert to 0-based index
-			lines[position:position] = change["content"]
-		elif change["type"] == "replace":
-			start = change["original_lines"][0] - 1
-			end = change["original_lines"][1]
-			del lines[start:end]
-			lines[start:start] = change["content"]
+		_, alo, ahi, blo, bhi = item
+
+		prefix = 0
+		while alo + prefix < ahi and blo + prefix < bhi and a[alo + prefix] == b[blo + prefix]:
+			prefix += 1
+		_add_block(blocks, alo, blo, prefix)
+		alo, blo = alo + prefix, blo + prefix
+
+		suffix = 0
+		while alo < ahi - suffix and blo < bhi - suffix and a[ahi - suffix - 1] == b[bhi - suffix - 1]:
+			suffix += 1
+		ahi, bhi = ahi - suffix, bhi - suffix
+		stack.append(("block", ahi, bhi, suffix))
+
+		if alo == ahi or blo == bhi:
+			continue
+
+		anchors = _get_unique_anchors(a, b, alo, ahi, blo, bhi)
+		if not anchors:
+			pending = []
+			for i, j in _myers_diff(a, b, alo, ahi, blo, bhi) or ():
+				pending.append(("block", i, j, 1))
+			stack.extend(reversed(pending))
+			continue
+
+		pending = []
+		for i, j in anchors:
+			pending.append(("range", alo, i, blo, j))
+			pending.append(("block", i, j, 1))
+			alo, blo = i + 1, j + 1
+		pending.append(("range", alo, ahi, blo, bhi))
+		stack.extend(reversed(pending))
+
+	return blocks
+
+
+def _add_block(blocks, i, j, size):
+	if not size:
+		return
+
+	if blocks:
+		last_i, last_j, last_size = blocks[-1]
+		if last_i + last_size == i and last_j + last_size == j:
+			blocks[-1] = (last_i, last_j, last_size + size)
+			return
+
+	blocks.append((i, j, size))
+
+
+def _get_unique_anchors(a, b, alo, ahi, blo, bhi):
+	"""Longest increasing run of line pairs that are unique on both sides"""
+	# index of the line, or -1 once it is seen twice
+	unique_a = {}
+	for i in range(alo, ahi):
+		unique_a[a[i]] = -1 if a[i] in unique_a else i
+
+	unique_b = {}
+	for j in range(blo, bhi):
+		unique_b[b[j]] = -1 if b[j] in unique_b else j
+
+	# dicts keep insertion order, so pairs are sorted by their position in `a`
+	pairs = [(i, unique_b[line]) for line, i in unique_a.items() if i != -1 and unique_b.get(line, -1) != -1]
+	if not pairs:
+		return []
+
+	# patience sorting on the positions in `b`
+	tails, tail_indexes, previous = [], [], [None] * len(pairs)
+	for index, (_i, j) in enumerate(pairs):
+		position = bisect.bisect_left(tails, j)
+		if position == len(tails):
+			tails.append(j)
+			tail_indexes.append(index)
+		else:
+			tails[position] = j
+			tail_indexes[position] = index
+		previous[index] = tail_indexes[position - 1] if position else None
+
+	anchors = []
+	index = tail_indexes[-1]
+	while index is not None:
+		anchors.append(pairs[index])
+		index = previous[index]
+
+	anchors.reverse()
+	return anchors
+
+
+def _myers_diff(a, b, alo, ahi, blo, bhi):
+	"""Matching line pairs of a shortest edit script, None when it takes more than MAX_MYERS_EDITS edits"""
+	n, m = ahi - alo, bhi - blo
+	if set(a[alo:ahi]).isdisjoint(b[blo:bhi]):
+		return []
+
+	max_edits = min(n + m, MAX_MYERS_EDITS)
+	offset = max_edits + 1
+	furthest = [0] * (2 * max_edits + 3)
+	trace = []
+
+	for edits in range(max_edits + 1):
+		# furthest reaching x per diagonal before this round, for diagonals -edits - 1 to edits + 1
+		trace.append(furthest[offset - edits - 1 : offset + edits + 2])
+
+		for k in range(-edits, edits + 1, 2):
+			if k == -edits or (k != edits and furthest[offset + k - 1] < furthest[offset + k + 1]):
+				x = furthest[offset + k + 1]
+			else:
+				x = furthest[offset + k - 1] + 1
+			y = x - k
+
+			while x < n and y < m and a[alo + x] == b[blo + y]:
+				x += 1
+				y += 1
+			furthest[offset + k] = x
+
+			if x >= n and y >= m:
+				return _backtrack(trace, edits, n, m, alo, blo)
+
+	return None
 
-	return "\n".join(lines)
 
+def _backtrack(trace, edits, x, y, alo, blo):
+	pairs = []
+	for d in range(edits, 0, -1):
+		furthest = trace[d]
+		k = x - y
+		if k == -d or (k != d and furthest[k - 1 + d + 1] < furthest[k + 1 + d + 1]):
+			previous_k = k + 1
+		else:
+			previous_k = k - 1
+		previous_x = furthest[previous_k + d + 1]
+		previous_y = previous_x - previous_k
 
-def highlight_changes(original_md, changes):
+		while x > previous_x and y > previous_y:
+			x, y = x - 1, y - 1
+			pairs.append((alo + x, blo + y))
+		x, y = previous_x, previous_y
+
+	while x > 0 and y > 0:
+		x, y = x - 1, y - 1
+		pairs.append((alo + x, blo + y))
+
+	pairs.reverse()
+	return pairs
+
+
+def get_opcodes(a, b):
+	"""
+	Same as `difflib.SequenceMatcher(None, a, b).get_opcodes()`, built from `diff_lines`.
+
+	Returns:
+				list: Tuples `(tag, i1, i2, j1, j2)` with tag one of "equal", "replace", "delete" or "insert".
+	"""
+	opcodes = []
+	i = j = 0
+	for block_i, block_j, size in [*diff_lines(a, b), (len(a), len(b), 0)]:
+		if i < block_i and j < block_j:
+			opcodes.append(("replace", i, block_i, j, block_j))
+		elif i < block_i:
+			opcodes.append(("delete", i, block_i, j, j))
+		elif j < block_j:
+			opcodes.append(("insert", i, i, j, block_j))
+
+		if size:
+			opcodes.append(("equal", block_i, block_i + size, block_j, block_j + size))
+		i, j = block_i + size, block_j + size
+
+	return opcodes
+
+
+def merge3(base_md, current_md, patch_md):
 	"""
-	Highlights changes in the original markdown text using <ins> and <del> tags.
+	Three-way merge of the changes a patch made to `base_md` into `current_md`,
+	the page as it is now, in a single pass over the two diffs from the base.
 
 	Args:
-				original_md (str): The original markdown text.
-				changes (list): A list of changes as returned by apply_markdown_diff.
+				base_md (str): The page content the patch was made from.
+				current_md (str): The page content now.
+				patch_md (str): The page content proposed by the patch.
 
 	Returns:
-				str: The modified markdown text with changes highlighted.
+				frappe._dict: `content`, the merged markdown, and `conflicts`, the regions changed
+				differently by both sides. Conflicting regions take the lines of the patch in `content`.
 	"""
-	lines = original_md.split("\n")
+	base = (base_md or "").split("\n")
+	current = (current_md or "").split("\n")
+	patch = (patch_md or "").split("\n")
 
-	# Sort changes in reverse order of their original line numbers to handle index shifting
-	sorted_changes = sorted(
-		changes, key=lambda x: (-x["original_lines"][0] if x["original_lines"] else -x["position"])
-	)
+	merged, conflicts = [], []
+	base_i = current_i = patch_i = 0
+
+	for base_start, base_end, current_start, current_end, patch_start, patch_end in _get_sync_regions(
+		base, current, patch
+	):
+		current_lines = current[current_i:current_start]
+		patch_lines = patch[patch_i:patch_start]
+
+		if current_lines or patch_lines:
+			base_lines = base[base_i:base_start]
+			if current_lines == patch_lines or current_lines == base_lines:
+				merged.extend(patch_lines)
+			elif patch_lines == base_lines:
+				merged.extend(current_lines)
+			else:
+				merged.extend(patch_lines)
+				conflicts.append(
+					{
+						# 1-based and inclusive, like the rest of the changes reported here
+						"base_lines": (base_i + 1, base_start),
+						"base": base_lines,
+						"current": current_lines,
+						"patch": patch_lines,
+					}
+				)
 
-	for change in sorted_changes:
-		if change["type"] == "delete":
-			start = change["original_lines"][0] - 1  # Convert to 0-based index
-			end = change["original_lines"][1]
-			# Wrap deleted lines with <del> tags
-			for i in range(start, end):
-				lines[i] = f"<del>{lines[i]}</del>"
-		elif change["type"] == "insert":
-			position = change["position"] - 1  # Convert to 0-based index
-			# Insert new lines with <ins> tags
-			for line in change["content"]:
-				lines.insert(position, f"<ins>{line}</ins>")
-				position += 1
-		elif change["type"] == "replace":
-			start = change["original_lines"][0] - 1
-			end = change["original_lines"][1]
-			# Wrap deleted lines with <del> tags
-			for i in range(start, end):
-				lines[i] = f"<del>{lines[i]}</del>"
-			# Insert new lines with <ins> tags after the deleted lines
-			insert_pos = end
-			for line in change["content"]:
-				lines.insert(insert_pos, f"<ins>{line}</ins>")
-				insert_pos += 1
+		merged.extend(base[base_start:base_end])
+		base_i, current_i, patch_i = base_end, current_end, patch_end
+
+	return frappe._dict(content="\n".join(merged), conflicts=conflicts)
+
+
+def _get_sync_regions(base, current, patch):
+	"""Regions of the base left alone by both sides, with their place in each side, plus an empty one at the end"""
+	current_blocks = diff_lines(base, current)
+	patch_blocks = diff_lines(base, patch)
+
+	regions = []
+	ci = pi = 0
+	while ci < len(current_blocks) and pi < len(patch_blocks):
+		current_base, current_match, current_size = current_blocks[ci]
+		patch_base, patch_match, patch_size = patch_blocks[pi]
+
+		start = max(current_base, patch_base)
+		end = min(current_base + current_size, patch_base + patch_size)
+		if start < end:
+			current_start = current_match + start - current_base
+			patch_start = patch_match + start - patch_base
+			regions.append(
+				(
+					start,
+					end,
+					current_start,
+					current_start + end - start,
+					patch_start,
+					patch_start + end - start,
+				)
+			)
+
+		if current_base + current_size < patch_base + patch_size:
+			ci += 1
+		else:
+			pi += 1
+
+	regions.append((len(base), len(base), len(current), len(current), len(patch), len(patch)))
+	return regions
+
+
+def highlight_diff(original_md, modified_md):
+	"""
+	Line diff of two markdown texts for review, with removed lines wrapped in
+	<del> and added lines in <ins>. Lines replaced one for one are diffed word
+	by word instead, so only the words that changed are highlighted.
+
+	Args:
+				original_md (str): The markdown text before the change.
+				modified_md (str): The markdown text after the change.
+
+	Returns:
+				str: The HTML escaped lines of the diff, joined by newlines.
+	"""
+	original_lines = (original_md or "").split("\n")
+	modified_lines = (modified_md or "").split("\n")
+
+	lines = []
+	for tag, i1, i2, j1, j2 in get_opcodes(original_lines, modified_lines):
+		if tag == "equal":
+			lines.extend(escape(line) for line in original_lines[i1:i2])
+			continue
+
+		paired = min(i2 - i1, j2 - j1) if tag == "replace" else 0
+		for offset in range(paired):
+			lines.append(_highlight_words(original_lines[i1 + offset], modified_lines[j1 + offset]))
+
+		lines.extend(f"<del>{escape(line)}</del>" for line in original_lines[i1 + paired : i2])
+		lines.extend(f"<ins>{escape(line)}</ins>" for line in modified_lines[j1 + paired : j2])
 
 	return "\n".join(lines)
+
+
+def _highlight_words(original_line, modified_line):
+	# split on whitespace but keep it, so joining the words gives back the line
+	original_words = re.split(r"(\s+)", original_line)
+	modified_words = re.split(r"(\s+)", modified_line)
+
+	parts = []
+	for tag, i1, i2, j1, j2 in get_opcodes(original_words, modified_words):
+		if tag == "equal":
+			parts.append(escape("".join(original_words[i1:i2])))
+			continue
+
+		if removed := "".join(original_words[i1:i2]):
+			parts.append(f"<del>{escape(removed)}</del>")
+		if added := "".join(modified_words[j1:j2]):
+			parts.append(f"<ins>{escape(added)}</ins>")
+
+	return "".join(parts)
@@ -6,14 +6,15 @@ from frappe.model.document import Document
 from frappe.rate_limiter import rate_limit
 from frappe.utils import validate_email_address
 
+from wiki.snapshot import get_wiki_snapshot
+
 
 class WikiFeedback(Document):
 	pass
 
 
 def get_feedback_limit():
-	wiki_settings = frappe.get_single("Wiki Settings")
-	return wiki_settings.feedback_submission_limit or 3
+	return get_wiki_snapshot().settings.feedback_submission_limit or 3
 
 
 @frappe.whitelist(allow_guest=True)
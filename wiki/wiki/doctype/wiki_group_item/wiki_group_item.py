@@ -1,9 +1,14 @@
 # Copyright (c) 2023, Frappe and contributors
 # For license information, please see license.txt
 
-# import frappe
+import frappe
 from frappe.model.document import Document
 
 
 class WikiGroupItem(Document):
 	pass
+
+
+def on_doctype_update():
+	# pages are looked up in their sidebar by `wiki_page` everywhere, see `get_space_of_page`
+	frappe.db.add_index("Wiki Group Item", ["wiki_page", "parenttype"])
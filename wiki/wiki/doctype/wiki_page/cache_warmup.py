@@ -0,0 +1,135 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and Contributors
+# MIT License. See license.txt
+
+"""
+Render published Wiki Pages ahead of traffic so the first visitor after a
+deploy or a cache clear doesn't pay for markdown, TOC, sidebar and next/prev
+lookups.
+
+Tunable via site config:
+- `wiki_cache_warmup_workers`: number of background jobs to spread pages over (default 2)
+- `wiki_cache_warmup_rate`: pages rendered per second by each job (default 5)
+- `wiki_disable_cache_warmup`: skip warming altogether
+"""
+
+import time
+
+import frappe
+from frappe.utils import add_days, cint, flt, now_datetime
+
+from wiki.cache import SETTINGS, SIDEBAR, get_cache_versions
+
+DEFAULT_WORKERS = 2
+DEFAULT_RATE = 5
+POPULARITY_WINDOW_DAYS = 30
+
+
+def warm_cache_in_background():
+	if (
+		frappe.conf.wiki_disable_cache_warmup
+		or frappe.conf.disable_website_cache
+		or frappe.conf.developer_mode
+	):
+		return
+
+	pages = get_pages_by_priority()
+	if not pages:
+		return
+
+	workers = max(cint(frappe.conf.wiki_cache_warmup_workers) or DEFAULT_WORKERS, 1)
+	# a warmup started before the settings changed again doesn't hold back the next one
+	versions = get_cache_versions(SETTINGS, SIDEBAR)
+
+	# interleave so that every worker starts with the most important pages
+	for i in range(workers):
+		if chunk := pages[i::workers]:
+			frappe.enqueue(
+				warm_pages,
+				pages=chunk,
+				versions=versions,
+				queue="long",
+				job_id=f"wiki_cache_warmup:{i}:{'.'.join(map(str, versions))}",
+				deduplicate=True,
+				enqueue_after_commit=True,
+			)
+
+
+def get_pages_by_priority() -> list[dict]:
+	"""Published pages, most viewed first, then in sidebar order"""
+	sidebar_order = {
+		d.wiki_page: position
+		for position, d in enumerate(
+			frappe.get_all(
+				"Wiki Group Item",
+				fields=["wiki_page"],
+				filters={"parenttype": "Wiki Space"},
+				order_by="parent asc, idx asc",
+			)
+		)
+	}
+
+	pages = frappe.get_all("Wiki Page", fields=["name", "route", "allow_guest"], filters={"published": 1})
+	views = get_page_views()
+
+	return sorted(
+		pages,
+		key=lambda page: (-views.get(page.route, 0), sidebar_order.get(page.name, len(sidebar_order))),
+	)
+
+
+def get_page_views() -> dict[str, int]:
+	"""View counts per route from website analytics, empty if analytics are not being recorded"""
+	if not frappe.db.table_exists("Web Page View"):
+		return {}
+
+	views = frappe.get_all(
+		"Web Page View",
+		fields=["path", {"COUNT": "*", "as": "count"}],
+		filters={"creation": [">=", add_days(now_datetime(), -POPULARITY_WINDOW_DAYS)]},
+		group_by="path",
+	)
+
+	return {d.path.strip("/"): d.count for d in views if d.path}
+
+
+def warm_pages(pages: list[dict], versions: list[int] | None = None):
+	interval = 1 / (flt(frappe.conf.wiki_cache_warmup_rate) or DEFAULT_RATE)
+	guest_access_disabled = frappe.db.get_single_value("Wiki Settings", "disable_guest_access")
+
+	for page in pages:
+		# the settings changed since, the warmup queued for them takes over
+		if versions and get_cache_versions(SETTINGS, SIDEBAR) != list(versions):
+			return
+
+		page = frappe._dict(page)
+		started = time.monotonic()
+
+		try:
+			warm_page(page, render_html=page.allow_guest and not guest_access_disabled)
+		except Exception:
+			frappe.log_error(f"Wiki cache warmup failed for {page.route}")
+
+		if (elapsed := time.monotonic() - started) < interval:
+			time.sleep(interval - elapsed)
+
+
+def warm_page(page: frappe._dict, render_html: bool = True):
+	from frappe.utils import set_request
+	from frappe.website.serve import get_response_content
+
+	from wiki.wiki.doctype.wiki_page.wiki_page import build_page_content
+
+	if render_html:
+		# fills the website cache and the sidebar cache, the way a guest visit would
+		user, request = frappe.session.user, getattr(frappe.local, "request", None)
+		try:
+			frappe.set_user("Guest")
+			frappe.local.response = frappe._dict({"docs": []})
+			set_request(method="GET", path=f"/{page.route}")
+			get_response_content(page.route)
+		finally:
+			frappe.set_user(user)
+			frappe.local.request = request
+
+	# fills the page cache used for navigating between pages
+	build_page_content(frappe.get_cached_doc("Wiki Page", page.name))
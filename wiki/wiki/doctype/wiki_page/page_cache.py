@@ -0,0 +1,80 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and Contributors
+# MIT License. See license.txt
+
+"""
+Payloads served by `get_page_content`, stored as one zlib compressed JSON
+value per page. Keys carry the version of the page and of Wiki Settings, so
+edits never have to delete anything: stale payloads are simply not read again
+and expire with their TTL. With a `volatile-*` maxmemory policy Redis evicts
+these keys first once it runs out of memory.
+
+Tunable via site config:
+- `wiki_page_cache_ttl`: seconds a payload is kept (default 1 day)
+- `wiki_page_cache_max_entry_size`: payloads larger than this many compressed bytes aren't cached (default 1 MB)
+"""
+
+import json
+import zlib
+
+import frappe
+from frappe.utils import cint, flt
+
+from wiki.cache import SETTINGS, get_cache_versions, page_key
+
+PAGE_CACHE_PREFIX = "wiki_page_content"
+PAGE_CACHE_STATS = "wiki_page_content_stats"
+DEFAULT_TTL = 24 * 60 * 60
+DEFAULT_MAX_ENTRY_SIZE = 1024 * 1024
+
+
+def get_page_cache_key(wiki_page: str) -> str:
+	settings_version, page_version = get_cache_versions(SETTINGS, page_key(wiki_page))
+	return frappe.cache.make_key(f"{PAGE_CACHE_PREFIX}:{wiki_page}:{settings_version}:{page_version}")
+
+
+def get_cached_page(wiki_page: str) -> tuple[str, dict | None]:
+	"""Cache key of `wiki_page` and its payload, if cached"""
+	cache_key = get_page_cache_key(wiki_page)
+	value = frappe.cache.get(cache_key)
+
+	frappe.cache.hincrby(frappe.cache.make_key(PAGE_CACHE_STATS), "hits" if value else "misses", 1)
+	if not value:
+		return cache_key, None
+
+	return cache_key, json.loads(zlib.decompress(value))
+
+
+def set_cached_page(cache_key: str, payload: dict):
+	value = zlib.compress(json.dumps(payload, separators=(",", ":")).encode())
+	if len(value) > (cint(frappe.conf.wiki_page_cache_max_entry_size) or DEFAULT_MAX_ENTRY_SIZE):
+		return
+
+	pipeline = frappe.cache.pipeline()
+	pipeline.set(cache_key, value, ex=cint(frappe.conf.wiki_page_cache_ttl) or DEFAULT_TTL)
+	pipeline.hincrby(frappe.cache.make_key(PAGE_CACHE_STATS), "bytes_written", len(value))
+	pipeline.execute()
+
+
+@frappe.whitelist()
+def get_page_cache_stats() -> dict:
+	"""Hit ratio of the page cache and the memory its live entries take"""
+	frappe.only_for("System Manager")
+
+	# `frappe.cache.hgetall` expects pickled values, the counters are plain integers
+	counters = frappe.cache.pipeline().hgetall(frappe.cache.make_key(PAGE_CACHE_STATS)).execute()[0]
+	stats = {key.decode(): cint(value) for key, value in counters.items()}
+	hits, misses = stats.get("hits", 0), stats.get("misses", 0)
+
+	keys = list(frappe.cache.scan_iter(match=frappe.cache.make_key(f"{PAGE_CACHE_PREFIX}:*"), count=1000))
+	pipeline = frappe.cache.pipeline()
+	for key in keys:
+		pipeline.strlen(key)
+
+	return {
+		"hits": hits,
+		"misses": misses,
+		"hit_ratio": flt(hits / (hits + misses), 4) if hits + misses else 0,
+		"bytes_written": stats.get("bytes_written", 0),
+		"entries": len(keys),
+		"bytes_stored": sum(pipeline.execute()) if keys else 0,
+	}
@@ -0,0 +1,129 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and Contributors
+# MIT License. See license.txt
+
+"""
+Diffs shown on the Wiki Page Patch form, cached by a hash of the two texts.
+
+`lxml.html.diff.htmldiff` diffs word by word and gets slow quickly as pages
+grow, so larger pages are diffed block by block (top level elements and
+paragraphs) and the largest ones in a background job the form polls for.
+
+Tunable via site config:
+- `wiki_preview_diff_max_size`: characters up to which pages are diffed word by word (default 100k)
+- `wiki_preview_diff_async_size`: characters from which the diff is built in the background (default 1M)
+- `wiki_preview_diff_limit`: characters beyond which no diff is built at all (default 5M)
+"""
+
+import hashlib
+import re
+from html import escape
+
+import frappe
+from frappe import _
+from frappe.utils import cint
+
+from wiki.utils import get_opcodes
+
+PREVIEW_DIFF_CACHE = "wiki_preview_diff"
+# long enough for the form to poll for it, previews are of texts anyone may send
+PREVIEW_DIFF_CACHE_TTL = 10 * 60
+DEFAULT_MAX_SIZE = 100_000
+DEFAULT_ASYNC_SIZE = 1_000_000
+DEFAULT_LIMIT = 5_000_000
+
+
+def get_preview_diff(original: str, new: str) -> dict:
+	"""`html` of the diff, or the `key` to poll with `get_preview_diff_result` while it is built"""
+	check_preview_permission()
+
+	original, new = original or "", new or ""
+	if len(original) + len(new) > (cint(frappe.conf.wiki_preview_diff_limit) or DEFAULT_LIMIT):
+		frappe.throw(_("The page is too large to preview the changes"))
+
+	key = get_preview_diff_key(original, new)
+
+	if (html := frappe.cache.get_value(key)) is not None:
+		return {"html": html}
+
+	if len(original) + len(new) >= (cint(frappe.conf.wiki_preview_diff_async_size) or DEFAULT_ASYNC_SIZE):
+		frappe.enqueue(
+			build_preview_diff,
+			queue="long",
+			job_id=key,
+			deduplicate=True,
+			key=key,
+			original=original,
+			new=new,
+		)
+		return {"key": key, "pending": True}
+
+	return {"html": build_preview_diff(key, original, new)}
+
+
+def get_preview_diff_result(key: str) -> dict:
+	check_preview_permission()
+
+	if not key.startswith(f"{PREVIEW_DIFF_CACHE}:"):
+		frappe.throw(_("Invalid preview key"))
+
+	html = frappe.cache.get_value(key)
+	return {"key": key, "pending": True} if html is None else {"html": html}
+
+
+def check_preview_permission():
+	"""Previews are for those who edit pages or raise patches for them"""
+	if not (
+		frappe.has_permission("Wiki Page", "write") or frappe.has_permission("Wiki Page Patch", "create")
+	):
+		frappe.throw(_("Not permitted to preview changes"), frappe.PermissionError)
+
+
+def get_preview_diff_key(original: str, new: str) -> str:
+	digest = hashlib.sha256(f"{len(original)}:{original}{new}".encode()).hexdigest()
+	return f"{PREVIEW_DIFF_CACHE}:{digest}"
+
+
+def build_preview_diff(key: str, original: str, new: str) -> str:
+	if len(original) + len(new) <= (cint(frappe.conf.wiki_preview_diff_max_size) or DEFAULT_MAX_SIZE):
+		from lxml.html.diff import htmldiff
+
+		html = htmldiff(original, new)
+	else:
+		html = block_diff(original, new)
+
+	frappe.cache.set_value(key, html, expires_in_sec=PREVIEW_DIFF_CACHE_TTL)
+	return html
+
+
+def block_diff(original: str, new: str) -> str:
+	"""Diff of whole blocks, removed blocks are wrapped in <del> and added ones in <ins>"""
+	original_blocks = get_blocks(original)
+	new_blocks = get_blocks(new)
+
+	parts = []
+	for tag, i1, i2, j1, j2 in get_opcodes(original_blocks, new_blocks):
+		if tag == "equal":
+			parts.extend(original_blocks[i1:i2])
+			continue
+
+		parts.extend(f"<del>{block}</del>" for block in original_blocks[i1:i2])
+		parts.extend(f"<ins>{block}</ins>" for block in new_blocks[j1:j2])
+
+	return "\n".join(parts)
+
+
+def get_blocks(html: str) -> list[str]:
+	"""Top level elements of `html`, text outside of them is split into paragraphs"""
+	if not html.strip():
+		return []
+
+	from lxml.html import fragments_fromstring, tostring
+
+	blocks = []
+	for fragment in fragments_fromstring(html):
+		if isinstance(fragment, str):
+			blocks.extend(escape(text) for text in re.split(r"\n\s*\n", fragment) if text.strip())
+		else:
+			blocks.append(tostring(fragment, encoding="unicode"))
+
+	return blocks
@@ -1,47 +1,39 @@
 import frappe
 from frappe import _
-from frappe.utils import cint
 
-from wiki.utils import apply_changes, apply_markdown_diff, highlight_changes
+from wiki.utils import get_patch_listing, highlight_diff, merge3
+from wiki.wiki.doctype.wiki_page_patch.wiki_page_patch import enqueue_apply_patches
 
+PATCH_DIFF_CACHE = "wiki_patch_diff"
+PATCH_PREVIEW_CACHE = "wiki_patch_preview"
+PATCH_DIFF_CACHE_TTL = 24 * 60 * 60
 
-def fetch_patches(start=0, limit=10):
-	patches = []
-	filters = [["status", "=", "Under Review"]]
 
-	# Add space filter if provided in URL
-	space = frappe.form_dict.get("space")
-	if space:
-		wiki_pages = frappe.get_all("Wiki Group Item", filters={"parent": space}, pluck="wiki_page")
-		if wiki_pages:
-			filters.append(["wiki_page", "in", wiki_pages])
+def fetch_patches(cursor=None, limit=10, space=None):
+	frappe.has_permission("Wiki Page Patch", "read", throw=True)
 
-	wiki_page_patches = frappe.get_list(
-		"Wiki Page Patch",
-		["name", "message", "status", "raised_by", "modified", "wiki_page"],
-		start=cint(start),
-		limit=cint(limit),
-		filters=filters,
-	)
+	wiki_page_patch = frappe.qb.DocType("Wiki Page Patch")
+	conditions = [wiki_page_patch.status == "Under Review"]
+	# the listing reads without permission queries, only approvers review everyone's patches
+	if not frappe.has_permission("Wiki Page Patch", "submit"):
+		conditions.append(wiki_page_patch.owner == frappe.session.user)
+	if space:
+		conditions.append(frappe.qb.DocType("Wiki Group Item").parent == space)
 
-	for patch in wiki_page_patches:
-		route = frappe.db.get_value("Wiki Page", patch.wiki_page, "route")
-		wiki_space_name = frappe.get_value("Wiki Group Item", {"wiki_page": patch.wiki_page}, "parent")
-		patch.space_name = (
-			frappe.get_value("Wiki Space", wiki_space_name, "space_name") if wiki_space_name else ""
-		)
-		patch.edit_link = f"/{route}?editWiki=1&wikiPagePatch={patch.name}"
+	patches, next_cursor = get_patch_listing(conditions, cursor, limit)
+	for patch in patches:
+		patch.space_name = patch.space_name or ""
+		patch.edit_link = f"/{patch.route}?editWiki=1&wikiPagePatch={patch.name}"
 		patch.color = "orange"
 		patch.modified = frappe.utils.pretty_date(patch.modified)
-		patches.extend([patch])
 
-	return patches
+	return patches, next_cursor
 
 
 @frappe.whitelist()
-def get_patches_api(start=0, limit=10):
-	patches = fetch_patches(start, limit)
-	return {"patches": patches}
+def get_patches_api(cursor=None, limit=10, space=None):
+	patches, next_cursor = fetch_patches(cursor, limit, space or frappe.form_dict.get("space"))
+	return {"patches": patches, "next_cursor": next_cursor}
 
 
 @frappe.whitelist()
@@ -49,7 +41,62 @@ def update_patch_status(patch, status):
 	if not frappe.has_permission("Wiki Page Patch", "write"):
 		frappe.throw(_("You don't have permission to update patch status"))
 
-	patch_doc = frappe.get_doc("Wiki Page Patch", patch)
+	set_patch_status(frappe.get_doc("Wiki Page Patch", patch), status)
+	return True
+
+
+@frappe.whitelist()
+def update_patches_status(patches, status):
+	"""
+	Approve or reject many patches in one transaction. Patches are applied in
+	the order they were raised, so several patches to one page merge one after
+	the other, by one background job that refreshes the search index and caches
+	once at the end. Patches that conflict with the page, or with the patches
+	approved before them, and patches the user may not submit are skipped.
+	"""
+	# approving and rejecting both submit the patch
+	if not frappe.has_permission("Wiki Page Patch", "submit"):
+		frappe.throw(_("You don't have permission to update patch status"), frappe.PermissionError)
+
+	if status not in ("Approved", "Rejected"):
+		frappe.throw(_("Status must be Approved or Rejected"))
+
+	names = frappe.get_all(
+		"Wiki Page Patch",
+		filters={"name": ["in", frappe.parse_json(patches)], "docstatus": 0},
+		order_by="creation asc",
+		pluck="name",
+	)
+
+	updated, failed = [], []
+	# approved patches are applied by a single background job once all of them are submitted,
+	# each one is checked against the content the patches before it leave the page with
+	batch = frappe.flags.wiki_patch_batch = frappe._dict(patches=[], contents={})
+	try:
+		for name in names:
+			contents = dict(batch.contents)
+			frappe.db.savepoint("wiki_page_patch")
+			try:
+				set_patch_status(frappe.get_doc("Wiki Page Patch", name), status)
+			except (frappe.ValidationError, frappe.PermissionError) as e:
+				frappe.db.rollback(save_point="wiki_page_patch")
+				frappe.clear_last_message()
+				failed.append({"name": name, "error": str(e)})
+				batch.contents = contents
+				if name in batch.patches:
+					batch.patches.remove(name)
+			else:
+				updated.append(name)
+	finally:
+		frappe.flags.wiki_patch_batch = None
+
+	if batch.patches:
+		enqueue_apply_patches(batch.patches)
+
+	return {"updated": updated, "failed": failed}
+
+
+def set_patch_status(patch_doc, status):
 	if status == "Approved":
 		patch_doc.status = "Approved"
 		patch_doc.approved_by = frappe.session.user
@@ -58,30 +105,69 @@ def update_patch_status(patch, status):
 		patch_doc.status = "Rejected"
 		patch_doc.submit()
 
-	return True
-
 
 @frappe.whitelist()
 def get_patch_diff(patch):
+	"""
+	Changes approving `patch` would make to its page. Cached until the patch or
+	the page is modified, so flipping through the review queue is cheap.
+	"""
 	if not frappe.has_permission("Wiki Page Patch", "write"):
 		frappe.throw(_("You don't have permission to view this patch"))
 
-	patch_doc = frappe.get_doc("Wiki Page Patch", patch)
-	original_doc = frappe.get_doc("Wiki Page", patch_doc.wiki_page)
+	patch_doc = get_patch(patch)
+	cache_key = get_patch_cache_key(PATCH_DIFF_CACHE, patch_doc)
 
-	patch_md = patch_doc.orignal_code or ""
-	original_md = "" if patch_doc.new else original_doc.content or ""
-	modified_md = patch_doc.new_code or ""
-
-	merge_old_content = apply_markdown_diff(patch_md, modified_md)[1]
-
-	merge_new_content = apply_changes(original_md, merge_old_content)
-
-	new_modified_md = apply_markdown_diff(original_md, merge_new_content)[1]
+	diff = frappe.cache.get_value(cache_key)
+	if diff is None:
+		original_md, merged = merge_patch(patch_doc)
+		diff = {"diff": highlight_diff(original_md, merged.content), "conflicts": len(merged.conflicts)}
+		frappe.cache.set_value(cache_key, diff, expires_in_sec=PATCH_DIFF_CACHE_TTL)
 
 	return {
-		"diff": highlight_changes(original_md, new_modified_md),
+		**diff,
 		"raised_by": patch_doc.raised_by,
 		"raised_on": frappe.utils.pretty_date(patch_doc.modified),
-		"merged_html": frappe.utils.md_to_html(merge_new_content),
 	}
+
+
+@frappe.whitelist()
+def get_patch_preview(patch):
+	"""Page as it would read once `patch` is approved, fetched when the reviewer opens the preview"""
+	if not frappe.has_permission("Wiki Page Patch", "write"):
+		frappe.throw(_("You don't have permission to view this patch"))
+
+	patch_doc = get_patch(patch)
+	cache_key = get_patch_cache_key(PATCH_PREVIEW_CACHE, patch_doc)
+
+	merged_html = frappe.cache.get_value(cache_key)
+	if merged_html is None:
+		merged_html = frappe.utils.md_to_html(merge_patch(patch_doc)[1].content)
+		frappe.cache.set_value(cache_key, merged_html, expires_in_sec=PATCH_DIFF_CACHE_TTL)
+
+	return {"merged_html": merged_html}
+
+
+def get_patch(patch: str) -> dict:
+	patch_doc = frappe.db.get_value(
+		"Wiki Page Patch", patch, ["name", "wiki_page", "new", "raised_by", "modified"], as_dict=True
+	)
+	if not patch_doc:
+		frappe.throw(_("Wiki Page Patch {0} not found").format(patch), frappe.DoesNotExistError)
+
+	patch_doc.page_modified = frappe.db.get_value("Wiki Page", patch_doc.wiki_page, "modified")
+	return patch_doc
+
+
+def get_patch_cache_key(prefix: str, patch_doc: dict) -> str:
+	return f"{prefix}:{patch_doc.name}:{patch_doc.modified}:{patch_doc.page_modified}"
+
+
+def merge_patch(patch_doc: dict) -> tuple[str, dict]:
+	"""Content of the page now and as merged with the patch, see `WikiPagePatch.update_old_page`"""
+	base_md, new_md = frappe.db.get_value("Wiki Page Patch", patch_doc.name, ["orignal_code", "new_code"])
+	original_md = (
+		"" if patch_doc.new else frappe.db.get_value("Wiki Page", patch_doc.wiki_page, "content") or ""
+	)
+
+	return original_md, merge3(base_md or original_md, original_md, new_md or "")
@@ -6,6 +6,7 @@ import frappe
 from frappe.utils import strip_html_tags, update_progress_bar
 from frappe.utils.redis_wrapper import RedisWrapper
 
+from wiki.snapshot import get_wiki_snapshot
 from wiki.wiki_search import WikiSearch
 
 PREFIX = "wiki_page_search_doc"
@@ -35,7 +36,7 @@ def search(
 	if not space and path:
 		space = get_space_route(path)
 
-	if frappe.db.get_single_value("Wiki Settings", "use_sqlite_for_search"):
+	if get_wiki_snapshot().settings.use_sqlite_for_search:
 		return sqlite_search(query, space)
 
 	if use_redis_search():
@@ -45,7 +46,7 @@ def search(
 
 
 def use_redis_search():
-	return frappe.db.get_single_value("Wiki Settings", "use_redisearch_for_search") and _redisearch_available
+	return get_wiki_snapshot().settings.use_redisearch_for_search and _redisearch_available
 
 
 def sqlite_search(query, space):
@@ -113,9 +114,7 @@ def redis_search(query, space):
 
 
 def get_space_route(path):
-	for space in frappe.db.get_all("Wiki Space", pluck="route"):
-		if space in path:
-			return space
+	return get_wiki_snapshot().get_space_route(path)
 
 
 def create_index_for_records(records, space):
@@ -127,7 +126,7 @@ def create_index_for_records(records, space):
 		key = r.make_key(f"{PREFIX}{space}:{d.name}").decode()
 		mapping = {
 			"title": d.title,
-			"content": strip_html_tags(d.content),
+			"content": d.plain_text or strip_html_tags(d.content),
 			"route": d.route,
 		}
 		super(RedisWrapper, r).hset(key, mapping=mapping)
@@ -146,7 +145,17 @@ def remove_index_for_records(records, space):
 
 
 def update_index(doc):
-	record = frappe._dict({"name": doc.name, "title": doc.title, "content": doc.content, "route": doc.route})
+	from wiki.wiki.doctype.wiki_page_artifact.wiki_page_artifact import get_artifact
+
+	record = frappe._dict(
+		{
+			"name": doc.name,
+			"title": doc.title,
+			"content": doc.content,
+			"plain_text": get_artifact(doc).plain_text,
+			"route": doc.route,
+		}
+	)
 	space = get_space_route(doc.route)
 
 	create_index_for_records([record], space)
@@ -164,8 +173,19 @@ def remove_index(doc):
 	remove_index_for_records([record], space)
 
 
+def remove_page_from_index(doc):
+	"""Remove a deleted page from the search index without rebuilding it"""
+	if get_wiki_snapshot().settings.use_sqlite_for_search:
+		from wiki.wiki.doctype.wiki_page.sqlite_search import remove_from_index
+
+		return remove_from_index(doc.name)
+
+	if use_redis_search():
+		return WikiSearch().remove_doc(doc)
+
+
 def drop_index(space: str | None = None):
-	if frappe.db.get_single_value("Wiki Settings", "use_sqlite_for_search"):
+	if get_wiki_snapshot().settings.use_sqlite_for_search:
 		from wiki.wiki.doctype.wiki_page.sqlite_search import delete_db
 
 		return delete_db()
@@ -195,7 +215,7 @@ def build_index_in_background():
 def build_index():
 	frappe.cache().set_value(INDEX_BUILD_FLAG, True)
 
-	if frappe.db.get_single_value("Wiki Settings", "use_sqlite_for_search"):
+	if get_wiki_snapshot().settings.use_sqlite_for_search:
 		from wiki.wiki.doctype.wiki_page.sqlite_search import build_index
 
 		return build_index()
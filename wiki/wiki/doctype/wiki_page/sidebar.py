@@ -0,0 +1,309 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and Contributors
+# MIT License. See license.txt
+
+import pickle
+
+import frappe
+from frappe import _
+from werkzeug.wrappers import Response
+
+from wiki.cache import (
+	SIDEBAR,
+	bump_cache_version,
+	get_cache_versions,
+	get_shared_cache_headers,
+	get_space_etag,
+	get_space_surrogate_keys,
+	get_validator_headers,
+	is_not_modified,
+	not_modified_response,
+	run_deferred,
+	space_key,
+)
+from wiki.snapshot import get_wiki_snapshot
+
+SIDEBAR_TREE_CACHE = "wiki_sidebar_tree"
+SIDEBAR_HTML_CACHE = "wiki_sidebar"
+NAVIGATION_CACHE = "wiki_navigation"
+# entries of older generations are never read again, this only bounds how long they linger
+SIDEBAR_CACHE_TTL = 7 * 24 * 60 * 60
+
+GUEST = "guest"
+USER = "user"
+AUDIENCES = (GUEST, USER)
+
+
+def get_audience() -> str:
+	"""Guests only see pages that allow guests, everyone else sees every page"""
+	return GUEST if frappe.session.user == "Guest" else USER
+
+
+def get_sidebar_tree(space: str, audience: str | None = None) -> dict[str, list[dict]]:
+	"""Sidebar items of `space` grouped by their label, in sidebar order"""
+	audience = audience or get_audience()
+	cache_key = get_sidebar_cache_key(SIDEBAR_TREE_CACHE, space)
+
+	tree = frappe.cache.hget(cache_key, audience)
+	if tree is None:
+		tree = build_sidebar_tree(space, audience)
+		_set_cache_field(cache_key, audience, tree)
+
+	return tree
+
+
+def build_sidebar_tree(space: str, audience: str) -> dict[str, list[dict]]:
+	items = frappe.get_all(
+		"Wiki Group Item",
+		fields=[
+			"parent_label",
+			"wiki_page as name",
+			"wiki_page.title as title",
+			"wiki_page.route as route",
+			"wiki_page.allow_guest as allow_guest",
+		],
+		filters={"parent": space, "parenttype": "Wiki Space", "hide_on_sidebar": 0},
+		order_by="idx asc",
+	)
+
+	tree = {}
+	for item in items:
+		if audience == GUEST and not item.allow_guest:
+			continue
+
+		tree.setdefault(item.parent_label, []).append(
+			{
+				"name": item.name,
+				"type": "Wiki Page",
+				"title": item.title,
+				"route": item.route,
+				"group_name": item.parent_label,
+			}
+		)
+
+	return tree
+
+
+def is_lazy_sidebar() -> bool:
+	"""Collapsed groups are sent without their items, see `get_sidebar_group`"""
+	if frappe.flags.wiki_full_sidebar:
+		return False
+
+	settings = get_wiki_snapshot().settings
+	return bool(settings.collapse_sidebar_groups and settings.lazy_load_sidebar_groups)
+
+
+def get_sidebar_html(space: str, audience: str | None = None, active_group: str | None = None) -> str:
+	"""
+	Rendered sidebar of `space`, shared by every page of the space. The active
+	page and group are marked on the client by `Wiki.activate_sidebars`.
+
+	With lazy loaded groups only the items of `active_group` are rendered, so
+	the sidebar is cached per group instead.
+	"""
+	audience = audience or get_audience()
+	lazy = is_lazy_sidebar()
+	cache_key = f"{audience}:{active_group}" if lazy else audience
+
+	sidebar_cache_key = get_sidebar_cache_key(SIDEBAR_HTML_CACHE, space)
+	sidebar_html = frappe.cache.hget(sidebar_cache_key, cache_key)
+	if not sidebar_html or frappe.conf.disable_website_cache or frappe.conf.developer_mode:
+		context = frappe._dict({})
+		context.collapse_sidebar_groups = get_wiki_snapshot().settings.collapse_sidebar_groups
+		context.lazy_load_sidebar_groups = lazy
+		context.active_sidebar_group = active_group
+		context.sidebar_items = get_sidebar_tree(space, audience)
+		context.space = space
+		context.wiki_search_scope = get_wiki_snapshot().get_space(space).route
+		sidebar_html = frappe.render_template(
+			"wiki/wiki/doctype/wiki_page/templates/web_sidebar.html", context
+		)
+		_set_cache_field(sidebar_cache_key, cache_key, sidebar_html)
+
+	return sidebar_html
+
+
+def get_sidebar_group_html(space: str, group: str, audience: str | None = None) -> str:
+	audience = audience or get_audience()
+	cache_key = f"items:{audience}:{group}"
+
+	sidebar_cache_key = get_sidebar_cache_key(SIDEBAR_HTML_CACHE, space)
+	group_html = frappe.cache.hget(sidebar_cache_key, cache_key)
+	if group_html is None or frappe.conf.disable_website_cache or frappe.conf.developer_mode:
+		group_html = frappe.render_template(
+			"wiki/wiki/doctype/wiki_page/templates/web_sidebar_group.html",
+			{"items": get_sidebar_tree(space, audience).get(group, [])},
+		)
+		_set_cache_field(sidebar_cache_key, cache_key, group_html)
+
+	return group_html
+
+
+@frappe.whitelist(allow_guest=True, methods=["GET"])
+def get_sidebar_group(space: str, group: str):
+	"""
+	Items of a collapsed sidebar group, fetched when the group is expanded.
+	Guests share one copy per group through the upstream cache.
+	"""
+	user_is_guest = frappe.session.user == "Guest"
+	if user_is_guest and get_wiki_snapshot().settings.disable_guest_access:
+		frappe.throw(_("You are not permitted to access this page"), frappe.PermissionError)
+
+	audience = get_audience()
+	# anything cached below is keyed by `space` and `group`, only cache what exists
+	if not get_wiki_snapshot().get_space(space) or group not in get_sidebar_tree(space, audience):
+		frappe.throw(_("Sidebar group not found"), frappe.DoesNotExistError)
+
+	etag = get_space_etag(space, group, audience)
+	headers = get_validator_headers(etag)
+	if user_is_guest:
+		headers.update(get_shared_cache_headers(get_space_surrogate_keys(space)))
+
+	if is_not_modified(etag):
+		return not_modified_response(headers)
+
+	return Response(
+		frappe.as_json({"message": get_sidebar_group_html(space, group, audience)}),
+		content_type="application/json",
+		headers=headers,
+	)
+
+
+def get_page_navigation(space: str | None, wiki_page: str, audience: str | None = None) -> dict:
+	"""Previous and next page of `wiki_page` in the sidebar order of `space`"""
+	navigation = None
+	if space:
+		audience = audience or get_audience()
+		cache_key = get_sidebar_cache_key(NAVIGATION_CACHE, space)
+
+		navigation = frappe.cache.hget(cache_key, f"{audience}:{wiki_page}")
+		# the audience field marks a navigation order that is built, pages missing from it aren't on the sidebar
+		if navigation is None and not frappe.cache.hget(cache_key, audience):
+			navigation = build_navigation(space, audience).get(f"{audience}:{wiki_page}")
+
+	return navigation or {"prev_page": None, "next_page": None}
+
+
+def build_navigation(space: str, audience: str) -> dict:
+	"""Store the neighbours of every page of `space`, one hash field per page"""
+	pages = [item for items in get_sidebar_tree(space, audience).values() for item in items]
+
+	navigation = {audience: True}
+	for i, page in enumerate(pages):
+		navigation[f"{audience}:{page['name']}"] = {
+			"prev_page": _get_link(pages[i - 1]) if i > 0 else None,
+			"next_page": _get_link(pages[i + 1]) if i < len(pages) - 1 else None,
+		}
+
+	# a single HSET for every page, values are pickled the way `frappe.cache.hget` expects them
+	cache_key = frappe.cache.make_key(get_sidebar_cache_key(NAVIGATION_CACHE, space))
+	pipeline = frappe.cache.pipeline()
+	pipeline.hset(cache_key, mapping={key: pickle.dumps(value) for key, value in navigation.items()})
+	pipeline.expire(cache_key, SIDEBAR_CACHE_TTL)
+	pipeline.execute()
+
+	return navigation
+
+
+def rebuild_navigation(space: str):
+	"""Precompute the navigation order of `space` once its sidebar is saved"""
+	run_deferred(("rebuild_navigation", space), _rebuild_navigation, space)
+
+
+def _rebuild_navigation(space: str):
+	for audience in AUDIENCES:
+		build_navigation(space, audience)
+
+
+def _get_link(page: dict) -> dict:
+	return {"name": page["name"], "title": page["title"], "route": page["route"]}
+
+
+def get_sidebar_cache_key(prefix: str, space: str) -> str:
+	"""
+	Sidebar caches of `space` live under keys that change with the generation
+	of every sidebar and with the version of the space, see `clear_sidebar_cache`
+	"""
+	generation, version = get_cache_versions(SIDEBAR, space_key(space))
+	return f"{prefix}:{space}:{generation}.{version}"
+
+
+def _set_cache_field(name: str, key: str, value):
+	frappe.cache.hset(name, key, value)
+	frappe.cache.expire(frappe.cache.make_key(name), SIDEBAR_CACHE_TTL)
+
+
+def clear_sidebar_cache(space: str | None = None):
+	"""
+	Invalidate the sidebar and navigation order of `space`, or of every space
+	if none is given. Nothing is deleted: bumping the version moves readers to
+	new keys, so this is O(1) however many spaces and groups are cached.
+	"""
+	bump_cache_version(space_key(space) if space else SIDEBAR)
+
+
+def reorder_sidebar_items(sidebars: dict[str, list[dict]]) -> int:
+	"""
+	Store the sidebar order submitted by the editor, `{group label: [items]}` in
+	order. Only rows whose group or position changed are written, in a single
+	UPDATE, and only the spaces they belong to are invalidated.
+
+	Returns:
+				int: Number of rows that changed.
+	"""
+	order = {}
+	for label, items in sidebars.items():
+		for item in items:
+			order[str(item["name"])] = (label, len(order) + 1)
+
+	if not order:
+		return 0
+
+	changed = [
+		row
+		for row in frappe.get_all(
+			"Wiki Group Item",
+			filters={"wiki_page": ["in", list(order)], "parenttype": "Wiki Space"},
+			fields=["name", "wiki_page", "parent", "parent_label", "idx"],
+		)
+		if (row.parent_label, row.idx) != order[row.wiki_page]
+	]
+	if not changed:
+		return 0
+
+	label_cases, idx_cases, values = [], [], {}
+	for i, row in enumerate(changed):
+		label, idx = order[row.wiki_page]
+		values.update({f"name_{i}": row.name, f"label_{i}": label, f"idx_{i}": idx})
+		label_cases.append(f"WHEN %(name_{i})s THEN %(label_{i})s")
+		idx_cases.append(f"WHEN %(name_{i})s THEN %(idx_{i})s")
+
+	frappe.db.sql(
+		f"""
+		UPDATE `tabWiki Group Item`
+		SET parent_label = CASE name {" ".join(label_cases)} END,
+			idx = CASE name {" ".join(idx_cases)} END
+		WHERE name IN %(names)s
+		""",
+		{**values, "names": [row.name for row in changed]},
+	)
+
+	for space in {row.parent for row in changed}:
+		clear_sidebar_cache(space)
+		rebuild_navigation(space)
+
+	return len(changed)
+
+
+def get_sidebar_position(wiki_page: str) -> tuple[str, str] | tuple[None, None]:
+	"""Space and sidebar group of `wiki_page`"""
+	return frappe.db.get_value(
+		"Wiki Group Item",
+		{"wiki_page": wiki_page, "parenttype": "Wiki Space"},
+		["parent", "parent_label"],
+	) or (None, None)
+
+
+def get_space_of_page(wiki_page: str) -> str | None:
+	return frappe.db.get_value(
+		"Wiki Group Item", {"wiki_page": wiki_page, "parenttype": "Wiki Space"}, "parent"
+	)
@@ -8,6 +8,8 @@ from typing import Any
 
 import frappe
 
+from wiki.wiki.doctype.wiki_page_artifact.wiki_page_artifact import get_artifacts
+
 
 def delete_db():
 	"""Delete the index"""
@@ -292,6 +294,24 @@ def build_index():
 	temp_path.rename(actual)
 
 
+def remove_from_index(name: str):
+	"""Remove a single page from the index, if it has been built"""
+	index_path = _get_index_path()
+	if not index_path.exists():
+		return
+
+	try:
+		with contextlib.closing(sqlite3.connect(index_path)) as conn:
+			cursor = conn.cursor()
+			_set_pragmas(cursor, is_read=False)
+			cursor.execute("DELETE FROM search_index WHERE name = ?", (name,))
+			cursor.execute("DELETE FROM search_fts WHERE name = ?", (name,))
+			conn.commit()
+	except sqlite3.OperationalError:
+		# rebuilt on the next search
+		delete_db()
+
+
 def _set_pragmas(cursor: sqlite3.Cursor, is_read: bool):
 	cursor.execute("PRAGMA journal_mode = WAL;")
 	cursor.execute("PRAGMA synchronous = NORMAL;")
@@ -363,7 +383,7 @@ def _add_to_index(doc: dict[str, Any], cursor: sqlite3.Cursor):
 		(
 			doc["name"],
 			doc["title"],
-			_clean_content(doc["content"]),  # Use cleaned content for search
+			doc.get("plain_text") or _clean_content(doc["content"]),  # Use plain text for search
 		),
 	)
 
@@ -397,8 +417,11 @@ def _get_index_items():
 		filters={"published": 1},
 	)
 
+	artifacts = get_artifacts(pages)
+
 	for i in pages:
 		i["space"] = sidebar_items.get(i.name, None)
 		i["modified"] = i["modified"].isoformat()
+		i["plain_text"] = artifacts[i.name].plain_text
 
 	return pages
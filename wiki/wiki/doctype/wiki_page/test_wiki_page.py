@@ -1,11 +1,39 @@
 # Copyright (c) 2020, Frappe and Contributors
 # See license.txt
 
+import json
 import unittest
 
 import frappe
+from frappe.utils import set_request
 
-from wiki.wiki.doctype.wiki_page.wiki_page import delete_wiki_page, update
+from wiki.cache import LOCAL_PURGE_ENDPOINT, PURGE_LOG, SETTINGS, bump_cache_version, get_purge_log
+from wiki.snapshot import get_wiki_snapshot
+from wiki.utils import get_patch_listing
+from wiki.wiki.doctype.wiki_page.cache_warmup import warm_page
+from wiki.wiki.doctype.wiki_page.preview_diff import block_diff
+from wiki.wiki.doctype.wiki_page.review_contributions import fetch_patches, update_patches_status
+from wiki.wiki.doctype.wiki_page.wiki_page import (
+	delete_wiki_page,
+	get_page_content,
+	get_pages_content,
+	preview,
+	update,
+)
+from wiki.wiki.doctype.wiki_page_revision.wiki_page_revision import delete_orphan_revisions
+from wiki.wiki.doctype.wiki_settings.wiki_settings import clear_wiki_page_cache
+
+CONTRIBUTOR = "wiki-contributor@example.com"
+
+
+def get_contributor() -> str:
+	"""A user who can raise patches but not approve them"""
+	if not frappe.db.exists("User", CONTRIBUTOR):
+		frappe.get_doc(
+			{"doctype": "User", "email": CONTRIBUTOR, "first_name": "Contributor", "send_welcome_email": 0}
+		).insert(ignore_permissions=True)
+
+	return CONTRIBUTOR
 
 
 class TestWikiPage(unittest.TestCase):
@@ -24,8 +52,13 @@ class TestWikiPage(unittest.TestCase):
 		self.wiki_page.save()
 
 	def tearDown(self):
+		frappe.set_user("Administrator")
+		frappe.local.request = None
 		self.wiki_page.delete()
 
+	def set_request(self, etag=None):
+		set_request(method="GET", path="/api/method/wiki", headers={"If-None-Match": etag} if etag else {})
+
 	def test_wiki_page_lifecycle(self):
 		self.assertEqual(
 			frappe.db.get_value("Wiki Page", {"route": "wiki/page"}, "name"), self.wiki_page.name
@@ -69,6 +102,112 @@ class TestWikiPage(unittest.TestCase):
 			2,
 		)
 
+	def test_bulk_patch_approval(self):
+		def raise_patch(content):
+			return frappe.get_doc(
+				{
+					"doctype": "Wiki Page Patch",
+					"wiki_page": self.wiki_page.name,
+					"status": "Under Review",
+					"raised_by": "Administrator",
+					"new_code": content,
+					"new_title": self.wiki_page.title,
+					"message": "test",
+				}
+			).insert()
+
+		appended = raise_patch("Hello World\nGoodbye")
+		prepended = raise_patch("Intro\nHello World")
+		# rewrites the line the patches above added lines around
+		conflicting = raise_patch("Hello Moon")
+
+		result = update_patches_status([conflicting.name, prepended.name, appended.name], "Approved")
+
+		self.assertEqual(result["updated"], [appended.name, prepended.name])
+		self.assertEqual([patch["name"] for patch in result["failed"]], [conflicting.name])
+		self.assertEqual(
+			frappe.db.get_value("Wiki Page", self.wiki_page.name, "content"), "Intro\nHello World\nGoodbye"
+		)
+		self.assertEqual(
+			[
+				frappe.db.get_value("Wiki Page Patch", patch.name, "apply_status")
+				for patch in (appended, prepended)
+			],
+			["Applied", "Applied"],
+		)
+		# checked against the page as the patches approved before it leave it, so never queued
+		self.assertEqual(
+			frappe.db.get_value("Wiki Page Patch", conflicting.name, ["status", "docstatus"]),
+			("Under Review", 0),
+		)
+
+		# only approvers approve
+		frappe.set_user(get_contributor())
+		with self.assertRaises(frappe.PermissionError):
+			update_patches_status([conflicting.name], "Rejected")
+
+	def raise_patch(self, content):
+		return frappe.get_doc(
+			{
+				"doctype": "Wiki Page Patch",
+				"wiki_page": self.wiki_page.name,
+				"status": "Under Review",
+				"raised_by": frappe.session.user,
+				"new_code": content,
+				"new_title": self.wiki_page.title,
+				"message": "test",
+			}
+		).insert()
+
+	def test_review_listing_limited_to_own_patches_for_non_approvers(self):
+		others = self.raise_patch("Raised by an approver")
+		frappe.set_user(get_contributor())
+		own = self.raise_patch("Raised by a contributor")
+
+		patches, _cursor = fetch_patches(limit=100)
+		self.assertEqual(
+			[patch.name for patch in patches if patch.wiki_page == self.wiki_page.name], [own.name]
+		)
+
+		frappe.set_user("Administrator")
+		patches, _cursor = fetch_patches(limit=100)
+		self.assertEqual(
+			sorted(patch.name for patch in patches if patch.wiki_page == self.wiki_page.name),
+			sorted([own.name, others.name]),
+		)
+
+	def test_patch_listing_pages_with_cursor(self):
+		for i in range(5):
+			frappe.get_doc(
+				{
+					"doctype": "Wiki Page Patch",
+					"wiki_page": self.wiki_page.name,
+					"status": "Under Review",
+					"raised_by": "Administrator",
+					"new_code": f"Version {i}",
+					"new_title": self.wiki_page.title,
+					"message": "test",
+				}
+			).insert()
+
+		patch = frappe.qb.DocType("Wiki Page Patch")
+		conditions = [patch.wiki_page == self.wiki_page.name]
+
+		listed, cursor = [], None
+		while True:
+			patches, cursor = get_patch_listing(conditions, cursor, limit=2)
+			listed.extend(patches)
+			if not cursor:
+				break
+
+		self.assertEqual(len(listed), 5)
+		self.assertEqual(len({patch.name for patch in listed}), 5)
+		self.assertEqual({patch.route for patch in listed}, {self.wiki_page.route})
+		self.assertEqual(
+			[(patch.modified, patch.name) for patch in listed],
+			sorted(((patch.modified, patch.name) for patch in listed), reverse=True),
+		)
+
 	def test_wiki_page_deletion(self):
 		delete_wiki_page(f"{self.wiki_page.route}")
 		self.assertEqual(frappe.db.exists("Wiki Page", self.wiki_page.name), None)
@@ -78,3 +217,139 @@ class TestWikiPage(unittest.TestCase):
 
 		sidebar_items = frappe.get_all("Wiki Group Item", {"wiki_page": self.wiki_page.name}, pluck="name")
 		self.assertEqual(sidebar_items, [])
+
+	def test_orphan_revisions_collected_after_deletion(self):
+		revisions = frappe.get_all(
+			"Wiki Page Revision Item", {"wiki_page": self.wiki_page.name}, pluck="parent"
+		)
+		delete_wiki_page(f"{self.wiki_page.route}")
+
+		self.assertFalse(frappe.db.exists("Wiki Page Revision Item", {"wiki_page": self.wiki_page.name}))
+		self.assertTrue(frappe.db.exists("Wiki Page Revision", revisions[0]))
+
+		delete_orphan_revisions(batch_size=1)
+		self.assertEqual(frappe.get_all("Wiki Page Revision", {"name": ["in", revisions]}), [])
+
+	def test_surrogate_keys_purged_on_update(self):
+		frappe.conf.wiki_purge_endpoint = LOCAL_PURGE_ENDPOINT
+		frappe.cache.delete(frappe.cache.make_key(PURGE_LOG))
+
+		try:
+			self.wiki_page.content = "Purge me"
+			self.wiki_page.save()
+			self.assertIn(f"wiki-page-{self.wiki_page.name}", get_purge_log())
+		finally:
+			del frappe.conf.wiki_purge_endpoint
+
+	def test_large_preview_diff_falls_back_to_blocks(self):
+		original = "\n".join(f"<p>Paragraph {i}</p>" for i in range(100))
+		new = original.replace("<p>Paragraph 50</p>", "<p>Paragraph fifty</p>")
+
+		diff = block_diff(original, new)
+		self.assertIn("<del><p>Paragraph 50</p>\n</del>", diff)
+		self.assertIn("<ins><p>Paragraph fifty</p>\n</ins>", diff)
+
+		frappe.conf.update(wiki_preview_diff_max_size=100, wiki_preview_diff_limit=len(original + new) + 5)
+		try:
+			self.assertEqual(preview(original, new, self.wiki_page.name)["html"], diff)
+
+			# nothing is diffed beyond the limit
+			with self.assertRaises(frappe.ValidationError):
+				preview(original, new + "<p>More</p>", self.wiki_page.name)
+		finally:
+			del frappe.conf.wiki_preview_diff_max_size
+			del frappe.conf.wiki_preview_diff_limit
+
+		frappe.set_user("Guest")
+		with self.assertRaises(frappe.PermissionError):
+			preview(original, new, self.wiki_page.name)
+
+	def test_page_content_conditional_get(self):
+		self.set_request()
+		response = get_page_content(self.wiki_page.name)
+		self.assertEqual(response.status_code, 200)
+		etag = response.headers["ETag"]
+
+		self.set_request(etag)
+		self.assertEqual(get_page_content(self.wiki_page.name).status_code, 304)
+
+		# Wiki Settings are rendered around the content
+		bump_cache_version(SETTINGS)
+		response = get_page_content(self.wiki_page.name)
+		self.assertEqual(response.status_code, 200)
+		self.assertNotEqual(response.headers["ETag"], etag)
+		etag = response.headers["ETag"]
+
+		self.wiki_page.content = "Changed content"
+		self.wiki_page.save()
+		self.set_request(etag)
+		response = get_page_content(self.wiki_page.name)
+		self.assertEqual(response.status_code, 200)
+		self.assertIn("Changed content", response.get_data(as_text=True))
+
+	def test_page_content_varies_by_audience(self):
+		self.wiki_page.allow_guest = 1
+		self.wiki_page.save()
+
+		self.set_request()
+		response = get_page_content(self.wiki_page.name)
+		self.assertIn("private", response.headers["Cache-Control"])
+		self.assertEqual(response.headers["Vary"], "Cookie")
+
+		frappe.set_user("Guest")
+		self.set_request(response.headers["ETag"])
+		guest_response = get_page_content(self.wiki_page.name)
+		self.assertEqual(guest_response.status_code, 200)
+		self.assertNotEqual(guest_response.headers["ETag"], response.headers["ETag"])
+		self.assertNotIn("private", guest_response.headers["Cache-Control"])
+
+	def test_pages_content_in_one_request(self):
+		self.wiki_page.allow_guest = 1
+		self.wiki_page.save()
+		private_page = frappe.get_doc(
+			{"doctype": "Wiki Page", "route": "wiki/private", "title": "Private", "content": "Private"}
+		).insert()
+		names = json.dumps([self.wiki_page.name, private_page.name])
+
+		try:
+			self.set_request()
+			response = get_pages_content(names)
+			self.assertEqual(
+				sorted(json.loads(response.get_data())["message"]),
+				sorted([self.wiki_page.name, private_page.name]),
+			)
+
+			# guests only get the pages they can read
+			frappe.set_user("Guest")
+			response = get_pages_content(names)
+			self.assertEqual(list(json.loads(response.get_data())["message"]), [self.wiki_page.name])
+
+			self.set_request(response.headers["ETag"])
+			self.assertEqual(get_pages_content(names).status_code, 304)
+		finally:
+			frappe.set_user("Administrator")
+			private_page.delete()
+
+	def test_settings_snapshot(self):
+		snapshot = get_wiki_snapshot()
+		self.assertIs(get_wiki_snapshot(), snapshot)
+		with self.assertRaises(TypeError):
+			snapshot.settings.logo = "changed"
+
+		# shared between requests until the settings change
+		frappe.local.wiki_snapshot = None
+		self.assertIs(get_wiki_snapshot(), snapshot)
+
+		bump_cache_version(SETTINGS)
+		frappe.local.wiki_snapshot = None
+		self.assertIsNot(get_wiki_snapshot(), snapshot)
+
+	def test_cache_warmup_keeps_user(self):
+		self.wiki_page.db_set("published", 1)
+		warm_page(frappe._dict(name=self.wiki_page.name, route=self.wiki_page.route))
+		self.assertEqual(frappe.session.user, "Administrator")
+
+		# only wiki managers clear the page cache
+		frappe.set_user(get_contributor())
+		with self.assertRaises(frappe.PermissionError):
+			clear_wiki_page_cache()
@@ -20,24 +20,66 @@ from frappe.utils.html_utils import (
 )
 from frappe.website.doctype.website_settings.website_settings import modify_header_footer_items
 from frappe.website.website_generator import WebsiteGenerator
-
-from wiki.wiki.doctype.wiki_page.search import build_index_in_background, drop_index
+from werkzeug.wrappers import Response
+
+from wiki.cache import (
+	SETTINGS,
+	SIDEBAR,
+	bump_cache_version,
+	get_cache_versions,
+	get_etag,
+	get_page_etag,
+	get_validator_headers,
+	is_not_modified,
+	not_modified_response,
+	page_key,
+	run_deferred,
+	space_key,
+)
+from wiki.snapshot import get_wiki_snapshot
+from wiki.wiki.doctype.wiki_page.page_cache import get_cached_page, set_cached_page
+from wiki.wiki.doctype.wiki_page.preview_diff import get_preview_diff, get_preview_diff_result
+from wiki.wiki.doctype.wiki_page.search import build_index_in_background, remove_page_from_index
+from wiki.wiki.doctype.wiki_page.sidebar import (
+	clear_sidebar_cache,
+	get_audience,
+	get_page_navigation,
+	get_sidebar_html,
+	get_sidebar_position,
+	get_space_of_page,
+)
+from wiki.wiki.doctype.wiki_page_artifact.wiki_page_artifact import (
+	build_artifact,
+	delete_artifact,
+	get_artifact,
+)
+from wiki.wiki.doctype.wiki_page_patch.counters import (
+	CONTRIBUTIONS,
+	DRAFTS,
+	PENDING,
+	get_patch_count,
+)
+from wiki.wiki.doctype.wiki_route_redirect.wiki_route_redirect import (
+	delete_route_redirects,
+	update_page_redirects,
+)
 from wiki.wiki.doctype.wiki_settings.wiki_settings import get_all_spaces
 
+MAX_PREFETCH_PAGES = 20
+
 
 class WikiPage(WebsiteGenerator):
 	def before_save(self):
-		if old_title := frappe.db.get_value("Wiki Page", self.name, "title"):
-			if old_title != self.title:
-				clear_sidebar_cache()
+		if old := frappe.db.get_value(
+			"Wiki Page", self.name, ["title", "route", "allow_guest"], as_dict=True
+		):
+			changed = (old.title, old.route, old.allow_guest) != (self.title, self.route, self.allow_guest)
+			if changed and (space := get_space_of_page(self.name)):
+				clear_sidebar_cache(space)
 
 	def after_insert(self):
 		frappe.cache().hdel("website_page", self.name)
 
-		# set via the clone method
-		if hasattr(frappe.local, "in_clone") and frappe.local.in_clone:
-			return
-
 		revision = frappe.new_doc("Wiki Page Revision")
 		revision.append("wiki_pages", {"wiki_page": self.name})
 		revision.content = self.content
@@ -46,20 +88,16 @@ class WikiPage(WebsiteGenerator):
 		revision.insert()
 
 	def on_update(self):
-		build_index_in_background()
-		self.clear_page_html_cache()
+		if self.get_doc_before_save() and self.has_value_changed("route"):
+			update_page_redirects(self.name, self.route)
+
+		build_artifact(self)
+		run_deferred("build_index", build_index_in_background)
+		bump_cache_version(page_key(self.name))
 
 	def on_trash(self):
-		frappe.db.sql("DELETE FROM `tabWiki Page Revision Item` WHERE wiki_page = %s", self.name)
-
-		frappe.db.sql(
-			"""DELETE FROM `tabWiki Page Revision` WHERE name in
-			(
-				SELECT name FROM `tabWiki Page Revision`
-				EXCEPT
-				SELECT DISTINCT parent from `tabWiki Page Revision Item`
-			)"""
-		)
+		# revisions left without pages are deleted in batches by `delete_orphan_revisions`
+		frappe.db.delete("Wiki Page Revision Item", {"wiki_page": self.name})
 
 		for name in frappe.get_all("Wiki Page Patch", {"wiki_page": self.name, "new": 0}, pluck="name"):
 			patch = frappe.get_doc("Wiki Page Patch", name)
@@ -72,13 +110,16 @@ class WikiPage(WebsiteGenerator):
 		for name in frappe.get_all("Wiki Page Patch", {"wiki_page": self.name, "new": 1}, pluck="name"):
 			frappe.db.set_value("Wiki Page Patch", name, "wiki_page", "")
 
+		space = get_space_of_page(self.name)
 		wiki_sidebar_name = frappe.get_value("Wiki Group Item", {"wiki_page": self.name})
 		frappe.delete_doc("Wiki Group Item", wiki_sidebar_name)
+		delete_artifact(self.name)
+		delete_route_redirects(self.name)
 
-		self.clear_page_html_cache()
-		clear_sidebar_cache()
-		drop_index()
-		build_index_in_background()
+		bump_cache_version(page_key(self.name))
+		if space:
+			clear_sidebar_cache(space)
+		remove_page_from_index(self)
 
 	def sanitize_html(self):
 		"""
@@ -153,7 +194,7 @@ class WikiPage(WebsiteGenerator):
 		self.save()
 
 	def verify_permission(self):
-		wiki_settings = frappe.get_single("Wiki Settings")
+		wiki_settings = get_wiki_snapshot().settings
 		user_is_guest = frappe.session.user == "Guest"
 
 		disable_guest_access = False
@@ -172,22 +213,11 @@ class WikiPage(WebsiteGenerator):
 		if frappe.form_dict:
 			context.parents = [{"route": "/" + self.route, "label": self.title}]
 		else:
-			parents = []
-			splits = self.route.split("/")
-			if splits:
-				for index, _route in enumerate(splits[:-1], start=1):
-					full_route = "/".join(splits[:index])
-					wiki_page = frappe.get_all(
-						"Wiki Page", filters=[["route", "=", full_route]], fields=["title"]
-					)
-					if wiki_page:
-						parents.append({"route": "/" + full_route, "label": wiki_page[0].title})
-
-				context.parents = parents
+			context.parents = get_breadcrumbs(self.route)
 
 	def get_space_route(self):
 		if space := frappe.get_value("Wiki Group Item", {"wiki_page": self.name}, "parent"):
-			return frappe.get_value("Wiki Space", space, "route")
+			return get_wiki_snapshot().get_space(space).route
 		else:
 			frappe.throw("Wiki Page doesn't have a Wiki Space associated with it. Please add them via Desk.")
 
@@ -221,45 +251,14 @@ class WikiPage(WebsiteGenerator):
 		if frappe.session.user != "Guest":
 			context.is_admin = frappe.has_permission("Wiki Page Patch", "write")
 			if context.is_admin:
-				wiki_space_name = frappe.get_value("Wiki Group Item", {"wiki_page": self.name}, "parent")
-				# Get all Wiki Pages in this space
-				wiki_pages_in_space = frappe.get_all(
-					"Wiki Group Item", filters={"parent": wiki_space_name}, pluck="wiki_page"
-				)
-				# Count pending patches for all pages in the space
-				context.pending_patches_count = frappe.db.count(
-					"Wiki Page Patch", {"wiki_page": ["in", wiki_pages_in_space], "status": "Under Review"}
-				)
-
-		wiki_settings = frappe.get_single("Wiki Settings")
-
-		# Extract wiki_space names in the original order
-		wiki_space_names = [entry.wiki_space for entry in wiki_settings.app_switcher_list]
-
-		# Fetch all linked Wiki Space documents
-		if wiki_space_names:
-			wiki_spaces = frappe.get_all(
-				"Wiki Space",
-				filters={"name": ["in", wiki_space_names]},
-				fields=["name", "space_name", "app_switcher_logo", "route"],
-			)
-
-			# Create a dictionary for quick lookup
-			wiki_spaces_dict = {doc.name: doc for doc in wiki_spaces}
-
-			# Reorder the documents based on the original list's order
-			ordered_wiki_spaces = [
-				wiki_spaces_dict[name] for name in wiki_space_names if name in wiki_spaces_dict
-			]
-		else:
-			ordered_wiki_spaces = []
+				context.pending_patches_count = get_patch_count(PENDING, get_space_of_page(self.name))
 
-		context.spaces = ordered_wiki_spaces
+		snapshot = get_wiki_snapshot()
+		wiki_settings = snapshot.settings
+		context.spaces = snapshot.get_app_switcher_spaces()
 
 		wiki_space_name = frappe.get_value("Wiki Group Item", {"wiki_page": self.name}, "parent")
-		wiki_space = (
-			frappe.get_cached_doc("Wiki Space", wiki_space_name) if wiki_space_name else frappe._dict()
-		)
+		wiki_space = snapshot.get_space(wiki_space_name)
 		context.wiki_space_name = wiki_space_name
 		# Do not cache in developer mode
 		context.no_cache = (
@@ -291,10 +290,9 @@ class WikiPage(WebsiteGenerator):
 		context.hide_on_sidebar = frappe.get_value(
 			"Wiki Group Item", {"wiki_page": self.name}, "hide_on_sidebar"
 		)
-		html = frappe.utils.md_to_html(self.content)
 		context.content = self.content
 		context.page_toc_html = (
-			self.calculate_toc_html(html) if wiki_settings.enable_table_of_contents else None
+			get_artifact(self).toc_html if wiki_settings.enable_table_of_contents else None
 		)
 
 		revisions = frappe.db.get_all(
@@ -319,7 +317,7 @@ class WikiPage(WebsiteGenerator):
 			context.favicon = wiki_space.favicon
 		context = context.update(
 			{
-				"navbar_items": modify_header_footer_items(wiki_space.navbar_items or wiki_settings.navbar),
+				"navbar_items": snapshot.get_navbar_items(wiki_space_name),
 				"post_login": [
 					{"label": _("My Account"), "url": "/me"},
 					{"label": _("Logout"), "url": "/?cmd=web_logout"},
@@ -335,62 +333,12 @@ class WikiPage(WebsiteGenerator):
 			}
 		)
 
-	def get_items(self, sidebar_items):
-		topmost = frappe.get_value("Wiki Group Item", {"wiki_page": self.name}, ["parent"])
-
-		sidebar_html = frappe.cache().hget("wiki_sidebar", topmost)
-		if not sidebar_html or frappe.conf.disable_website_cache or frappe.conf.developer_mode:
-			context = frappe._dict({})
-			wiki_settings = frappe.get_single("Wiki Settings")
-			context.active_sidebar_group = frappe.get_value(
-				"Wiki Group Item", {"wiki_page": self.name}, ["parent_label"]
-			)
-			context.current_route = self.route
-			context.collapse_sidebar_groups = wiki_settings.collapse_sidebar_groups
-			context.sidebar_items = sidebar_items
-			context.wiki_search_scope = self.get_space_route()
-			sidebar_html = frappe.render_template(
-				"wiki/wiki/doctype/wiki_page/templates/web_sidebar.html", context
-			)
-			frappe.cache().hset("wiki_sidebar", topmost, sidebar_html)
-		return sidebar_html
-
 	def get_sidebar_items(self):
-		wiki_sidebar = frappe.get_doc("Wiki Space", {"route": self.get_space_route()}).wiki_sidebars
-		sidebar = {}
-
-		for sidebar_item in wiki_sidebar:
-			if sidebar_item.hide_on_sidebar:
-				continue
-
-			wiki_page = frappe.get_cached_doc("Wiki Page", sidebar_item.wiki_page)
-
-			permitted = wiki_page.allow_guest or frappe.session.user != "Guest"
-			if not permitted:
-				continue
-
-			if sidebar_item.parent_label not in sidebar:
-				sidebar[sidebar_item.parent_label] = [
-					{
-						"name": wiki_page.name,
-						"type": "Wiki Page",
-						"title": wiki_page.title,
-						"route": wiki_page.route,
-						"group_name": sidebar_item.parent_label,
-					}
-				]
-			else:
-				sidebar[sidebar_item.parent_label] += [
-					{
-						"name": wiki_page.name,
-						"type": "Wiki Page",
-						"title": wiki_page.title,
-						"route": wiki_page.route,
-						"group_name": sidebar_item.parent_label,
-					}
-				]
+		space, group = get_sidebar_position(self.name)
+		if not space:
+			frappe.throw("Wiki Page doesn't have a Wiki Space associated with it. Please add them via Desk.")
 
-		return self.get_items(sidebar)
+		return get_sidebar_html(space, active_group=group)
 
 	def get_last_revision(self):
 		last_revision = frappe.db.get_value(
@@ -398,79 +346,46 @@ class WikiPage(WebsiteGenerator):
 		)
 		return frappe.get_doc("Wiki Page Revision", last_revision)
 
-	def clone(self, original_space, new_space):
-		# used in after_insert of Wiki Page to resist create of Wiki Page Revision
-		frappe.local.in_clone = True
-
-		cloned_wiki_page = frappe.copy_doc(self, ignore_no_copy=True)
-		cloned_wiki_page.route = cloned_wiki_page.route.replace(original_space, new_space)
 
-		cloned_wiki_page.flags.ignore_mandatory = True
-		cloned_wiki_page.save()
+def get_breadcrumbs(route: str) -> list[dict]:
+	"""Pages at every parent route of `route`, outermost first, fetched in one query"""
+	splits = route.split("/")
+	parent_routes = ["/".join(splits[:index]) for index in range(1, len(splits))]
+	if not parent_routes:
+		return []
 
-		items = frappe.get_all(
-			"Wiki Page Revision",
-			filters={
-				"wiki_page": self.name,
-			},
-			fields=["name"],
-			pluck="name",
-			order_by="`tabWiki Page Revision`.creation",
+	titles = dict(
+		frappe.get_all(
+			"Wiki Page", filters={"route": ["in", parent_routes]}, fields=["route", "title"], as_list=True
 		)
+	)
 
-		for item in items:
-			revision = frappe.get_doc("Wiki Page Revision", item)
-			revision.append("wiki_pages", {"wiki_page": cloned_wiki_page.name})
-			revision.save()
-
-		self.update_time_and_user("Wiki Page", cloned_wiki_page.name, self)
-
-		return cloned_wiki_page
-
-	def update_time_and_user(self, dt, dn, new_doc):
-		for field in ("modified", "modified_by", "creation", "owner"):
-			frappe.db.set_value(dt, dn, field, new_doc.get(field))
-
-	def clear_page_html_cache(self):
-		html_cache_key = f"wiki_page_html:{self.name}"
-
-		frappe.cache.hdel(html_cache_key, "content")
-		frappe.cache.hdel(html_cache_key, "page_title")
-		frappe.cache.hdel(html_cache_key, "toc_html")
-		frappe.cache.hdel(html_cache_key, "next_page")
-		frappe.cache.hdel(html_cache_key, "prev_page")
+	return [
+		{"route": "/" + parent_route, "label": titles[parent_route]}
+		for parent_route in parent_routes
+		if parent_route in titles
+	]
 
 
 def get_open_contributions():
-	count = len(
-		frappe.get_list(
-			"Wiki Page Patch",
-			filters=[["status", "=", "Under Review"], ["raised_by", "=", frappe.session.user]],
-		)
-	)
+	count = get_patch_count(CONTRIBUTIONS, frappe.session.user)
 	return f'<span class="count">{count}</span>'
 
 
 def get_open_drafts():
-	count = len(
-		frappe.get_list(
-			"Wiki Page Patch",
-			filters=[["status", "=", "Draft"], ["owner", "=", frappe.session.user]],
-		)
-	)
+	count = get_patch_count(DRAFTS, frappe.session.user)
 	return f'<span class="count">{count}</span>'
 
 
-def clear_sidebar_cache():
-	for key in frappe.cache.hgetall("wiki_sidebar").keys():
-		frappe.cache.hdel("wiki_sidebar", key)
-
-
 @frappe.whitelist()
 def preview(original_code, new_code, name):
-	from lxml.html.diff import htmldiff
+	return get_preview_diff(original_code, new_code)
 
-	return htmldiff(original_code, new_code)
+
+@frappe.whitelist()
+def get_preview(key):
+	"""Poll for a preview diff that is being built in the background"""
+	return get_preview_diff_result(key)
 
 
 @frappe.whitelist()
@@ -583,10 +498,11 @@ def update(
 		out.route = "drafts"
 	elif not frappe.has_permission(doctype="Wiki Page Patch", ptype="submit", throw=False):
 		out.route = "contributions"
-	elif hasattr(patch, "new_wiki_page"):
-		out.route = patch.new_wiki_page.route
 	else:
-		out.route = patch.wiki_page_doc.route
+		# approved patches are applied in the background, the editor polls `get_apply_status` until then
+		out.patch = patch.name
+		out.apply_status = frappe.db.get_value("Wiki Page Patch", patch.name, "apply_status")
+		out.route = patch.get_new_page_route() if patch.new else patch.wiki_page_doc.route
 
 	return out
 
@@ -621,6 +537,11 @@ def get_sidebar_for_page(wiki_page):
 	return sidebar
 
 
+def get_navigation_for_page(wiki_page):
+	navigation = get_page_navigation(get_space_of_page(wiki_page), wiki_page)
+	return frappe.render_template("wiki/wiki/doctype/wiki_page/templates/page_navigation.html", navigation)
+
+
 @frappe.whitelist()
 def approve(wiki_page_patch):
 	if not frappe.has_permission(doctype="Wiki Page Patch", ptype="submit", throw=False):
@@ -660,7 +581,8 @@ def update_page_settings(name, settings):
 	from frappe.utils import sbool
 
 	frappe.has_permission(doctype="Wiki Page", ptype="write", doc=name, throw=True)
-	clear_sidebar_cache()
+	if space := get_space_of_page(name):
+		clear_sidebar_cache(space)
 	settings = frappe.parse_json(settings)
 
 	frappe.db.set_value(
@@ -682,17 +604,12 @@ def get_markdown_content(wikiPageName, wikiPagePatch):
 
 @frappe.whitelist(allow_guest=True)
 def get_page_content(wiki_page_name: str):
-	html_cache_key = f"wiki_page_html:{wiki_page_name}"
-
-	content = frappe.cache.hget(html_cache_key, "content")
-	page_title = frappe.cache.hget(html_cache_key, "page_title")
-	# TOC can be "None" if user has disabled it
-	toc_html = frappe.cache.hget(html_cache_key, "toc_html")
-	next_page = frappe.cache.hget(html_cache_key, "next_page")
-	prev_page = frappe.cache.hget(html_cache_key, "prev_page")
-
+	"""
+	Content of a Wiki Page for navigating between pages, supports conditional
+	GET requests so that pages the client has already seen cost a 304
+	"""
 	wiki_page = frappe.get_cached_doc("Wiki Page", wiki_page_name)
-	wiki_settings = frappe.get_single("Wiki Settings")
+	wiki_settings = get_wiki_snapshot().settings
 
 	user_is_guest = frappe.session.user == "Guest"
 
@@ -700,46 +617,93 @@ def get_page_content(wiki_page_name: str):
 		frappe.local.response.http_status_code = 403
 		frappe.throw(_("You are not permitted to access this page"), frappe.PermissionError)
 
-	if not all([content, page_title, next_page, prev_page]):
-		md_content = wiki_page.content
+	wiki_space_name = frappe.get_value("Wiki Group Item", {"wiki_page": wiki_page_name}, "parent")
+	etag = get_page_etag(wiki_page, wiki_space_name, get_audience())
+	headers = get_page_content_headers(etag, wiki_page.modified)
+
+	if is_not_modified(etag, wiki_page.modified):
+		return not_modified_response(headers)
+
+	return Response(
+		frappe.as_json({"message": build_page_content(wiki_page, wiki_space_name)}),
+		content_type="application/json",
+		headers=headers,
+	)
+
 
-		content = frappe.utils.md_to_html(md_content)
-		toc_html = wiki_page.calculate_toc_html(content) if wiki_settings.enable_table_of_contents else None
-		page_title = wiki_page.title
+@frappe.whitelist(allow_guest=True, methods=["GET"])
+def get_pages_content(wiki_page_names: str | list):
+	"""
+	Content of several Wiki Pages in one request, used to prefetch the pages
+	a reader is likely to open next. Pages the user can't read are left out.
+	"""
+	if isinstance(wiki_page_names, str):
+		wiki_page_names = frappe.parse_json(wiki_page_names)
+	wiki_page_names = list(dict.fromkeys(wiki_page_names))[:MAX_PREFETCH_PAGES]
+
+	user_is_guest = frappe.session.user == "Guest"
+	if user_is_guest and get_wiki_snapshot().settings.disable_guest_access:
+		frappe.local.response.http_status_code = 403
+		frappe.throw(_("You are not permitted to access this page"), frappe.PermissionError)
 
-		wiki_space_name = frappe.get_value("Wiki Group Item", {"wiki_page": wiki_page_name}, "parent")
-		sidebar_items = frappe.get_all(
+	pages = frappe.get_all(
+		"Wiki Page",
+		filters={"name": ["in", wiki_page_names]},
+		fields=["name", "modified", "allow_guest"],
+		order_by="name asc",
+	)
+	pages = [page for page in pages if page.allow_guest or not user_is_guest]
+	spaces = dict(
+		frappe.get_all(
 			"Wiki Group Item",
-			filters={"parent": wiki_space_name, "hide_on_sidebar": 0},
-			fields=["wiki_page", "idx"],
-			order_by="idx",
+			filters={"wiki_page": ["in", [page.name for page in pages]], "parenttype": "Wiki Space"},
+			fields=["wiki_page", "parent"],
+			as_list=True,
 		)
+	)
 
-		current_idx = next(
-			(i for i, item in enumerate(sidebar_items) if item.wiki_page == wiki_page_name), -1
-		)
-		next_page = prev_page = None
-
-		if current_idx != -1:
-			if current_idx > 0:
-				prev_page = frappe.get_value(
-					"Wiki Page", sidebar_items[current_idx - 1].wiki_page, ["title", "route"], as_dict=True
-				)
-			if current_idx < len(sidebar_items) - 1:
-				next_page = frappe.get_value(
-					"Wiki Page", sidebar_items[current_idx + 1].wiki_page, ["title", "route"], as_dict=True
-				)
-
-		frappe.cache.hset(html_cache_key, "content", content)
-		frappe.cache.hset(html_cache_key, "page_title", page_title)
-		frappe.cache.hset(html_cache_key, "toc_html", toc_html)
-		frappe.cache.hset(html_cache_key, "next_page", next_page)
-		frappe.cache.hset(html_cache_key, "prev_page", prev_page)
-
-	return {
-		"title": page_title,
-		"content": content,
-		"toc_html": toc_html,
-		"next_page": next_page,
-		"prev_page": prev_page,
+	versions = get_cache_versions(SETTINGS, SIDEBAR, *sorted({space_key(space) for space in spaces.values()}))
+	etag = get_etag(get_audience(), *versions, *(f"{page.name}@{page.modified}" for page in pages))
+	headers = get_page_content_headers(etag)
+
+	if is_not_modified(etag):
+		return not_modified_response(headers)
+
+	content = {
+		page.name: build_page_content(frappe.get_cached_doc("Wiki Page", page.name), spaces.get(page.name))
+		for page in pages
 	}
+
+	return Response(frappe.as_json({"message": content}), content_type="application/json", headers=headers)
+
+
+def get_page_content_headers(etag: str, last_modified=None) -> dict:
+	"""
+	Prev/next links depend on the audience, so are ETags. Payloads of logged in
+	users may name pages guests can't see, keep them out of shared caches.
+	"""
+	headers = {**get_validator_headers(etag, last_modified), "Vary": "Cookie"}
+	if frappe.session.user != "Guest":
+		headers["Cache-Control"] = "private, no-cache"
+
+	return headers
+
+
+def build_page_content(wiki_page, wiki_space_name: str | None = None) -> dict:
+	cache_key, page = get_cached_page(wiki_page.name)
+
+	if not page:
+		artifact = get_artifact(wiki_page)
+		page = {
+			"title": wiki_page.title,
+			"content": artifact.html,
+			# TOC is None if it is disabled in Wiki Settings
+			"toc_html": artifact.toc_html if get_wiki_snapshot().settings.enable_table_of_contents else None,
+		}
+		set_cached_page(cache_key, page)
+
+	if not wiki_space_name:
+		wiki_space_name = get_space_of_page(wiki_page.name)
+	navigation = get_page_navigation(wiki_space_name, wiki_page.name)
+
+	return {**page, **navigation}
@@ -1,13 +1,32 @@
+import gzip
 import re
 from urllib.parse import quote
 
 import frappe
+from frappe.utils import cint
 from frappe.website.page_renderers.document_page import DocumentPage
 from frappe.website.utils import build_response
+from werkzeug.wrappers import Response
 
-from wiki.wiki.doctype.wiki_page.wiki_page import get_sidebar_for_page
+from wiki.cache import (
+	WEBSITE,
+	get_cache_versions,
+	get_page_etag,
+	get_page_surrogate_keys,
+	get_shared_cache_headers,
+	get_validator_headers,
+	is_not_modified,
+	not_modified_response,
+)
+from wiki.wiki.doctype.wiki_page.wiki_page import get_navigation_for_page, get_sidebar_for_page
+from wiki.wiki.doctype.wiki_route_redirect.wiki_route_redirect import get_route_redirect
 
 reg = re.compile("<!--sidebar-->")
+NAVIGATION_PLACEHOLDER = "<!--page-navigation-->"
+
+# fully assembled guest responses, keyed by their ETag
+RENDERED_PAGE_CACHE = "wiki_rendered_page"
+RENDERED_PAGE_TTL = 24 * 60 * 60
 
 
 class WikiPageRenderer(DocumentPage):
@@ -29,11 +48,87 @@ class WikiPageRenderer(DocumentPage):
 			)
 			frappe.redirect(f"/{quote(topmost_wiki_route)}")
 
+		# pages that moved along with their space keep answering at their old route
+		target = get_route_redirect(self.path)
+		if target and frappe.db.exists("Wiki Page", {"route": target, "published": 1}):
+			frappe.redirect(f"/{quote(target)}")
+
 	def render(self):
+		if frappe.session.user == "Guest":
+			# pages rendered for logged in users carry the CSRF token and per user counts
+			wiki_page = frappe.db.get_value(self.doctype, self.docname, ["name", "modified"], as_dict=True)
+			space = frappe.db.get_value("Wiki Group Item", {"wiki_page": self.docname}, "parent")
+			etag = self.get_etag(wiki_page, space)
+			# no Last-Modified, the page changes with the sidebar and settings as well
+			self.headers = {
+				**(self.headers or {}),
+				**get_validator_headers(etag),
+				**get_shared_cache_headers(get_page_surrogate_keys(self.docname, space)),
+			}
+
+			if is_not_modified(etag):
+				return not_modified_response(self.headers)
+
+			if response := self.get_cached_response(etag):
+				return response
+		else:
+			etag = None
+			self.headers = {**(self.headers or {}), "Cache-Control": "private, no-cache"}
+
 		html = self.get_html()
 		html = self.add_csrf_token(html)
 		html = self.add_sidebar(html)
-		return build_response(self.path, html, self.http_status_code or 200, self.headers)
+		html = self.add_navigation(html)
+		response = build_response(self.path, html, self.http_status_code or 200, self.headers)
+
+		if etag and response.status_code == 200:
+			self.cache_response(etag, response)
+
+		return response
+
+	def get_etag(self, wiki_page, space):
+		# pages with a full sidebar (static exports) and with lazy loaded groups are different pages
+		sidebar = "full" if frappe.flags.wiki_full_sidebar else "default"
+		return get_page_etag(wiki_page, space, "page", sidebar, *get_cache_versions(WEBSITE))
+
+	def get_cached_response(self, etag):
+		"""
+		Guests all get the same page for an ETag, serve it without rendering,
+		injecting the sidebar or even decompressing it when the client takes gzip
+		"""
+		if frappe.conf.disable_website_cache or frappe.conf.developer_mode:
+			return
+
+		cached = frappe.cache.get_value(f"{RENDERED_PAGE_CACHE}:{etag}")
+		if not cached:
+			return
+
+		headers, body = cached
+		if "gzip" in (frappe.request.headers.get("Accept-Encoding") or ""):
+			headers = {**headers, "Content-Encoding": "gzip"}
+		else:
+			body = gzip.decompress(body)
+
+		return Response(body, status=200, headers={**headers, "Vary": "Accept-Encoding"})
+
+	def cache_response(self, etag, response):
+		if frappe.conf.disable_website_cache or frappe.conf.developer_mode:
+			return
+
+		headers = {
+			key: value
+			for key, value in response.headers.items()
+			if key.lower() not in ("content-length", "content-encoding", "set-cookie")
+		}
+		frappe.cache.set_value(
+			f"{RENDERED_PAGE_CACHE}:{etag}",
+			(headers, gzip.compress(response.get_data(), compresslevel=6)),
+			expires_in_sec=cint(frappe.conf.wiki_page_cache_ttl) or RENDERED_PAGE_TTL,
+		)
 
 	def add_sidebar(self, html):
 		return reg.sub(get_sidebar_for_page(self.docname), html)
+
+	def add_navigation(self, html):
+		# like the sidebar, prev/next links follow the sidebar order and aren't part of the cached page
+		return html.replace(NAVIGATION_PLACEHOLDER, get_navigation_for_page(self.docname))
@@ -0,0 +1,73 @@
+# Copyright (c) 2026, Frappe and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+from frappe.utils import set_request
+
+from wiki.wiki.doctype.wiki_page_artifact.wiki_page_artifact import (
+	get_artifact,
+	get_artifacts,
+	get_content_hash,
+)
+
+
+class TestWikiPageArtifact(FrappeTestCase):
+	def setUp(self):
+		self.wiki_page = frappe.get_doc(
+			{
+				"doctype": "Wiki Page",
+				"route": "test-artifact/page",
+				"title": "Artifact",
+				"content": "# Intro\n\nRead [the docs](https://frappe.io/docs) first.",
+				"published": 1,
+			}
+		).insert()
+
+	def tearDown(self):
+		frappe.local.request = None
+		self.wiki_page.delete()
+
+	def get_stored(self, fields="content_hash"):
+		return frappe.db.get_value("Wiki Page Artifact", {"wiki_page": self.wiki_page.name}, fields)
+
+	def test_artifact_built_on_save(self):
+		artifact = get_artifact(self.wiki_page)
+
+		self.assertEqual(self.get_stored(), get_content_hash(self.wiki_page.title, self.wiki_page.content))
+		self.assertEqual([heading["id"] for heading in artifact.headings], ["intro"])
+		self.assertEqual(artifact.links, [{"tag": "a", "url": "https://frappe.io/docs"}])
+		self.assertEqual(artifact.word_count, 5)
+
+		self.wiki_page.content = "Rewritten"
+		self.wiki_page.save()
+		self.assertEqual(self.get_stored("plain_text"), "Rewritten")
+
+	def test_stale_artifact_rebuilt(self):
+		frappe.db.set_value("Wiki Page Artifact", {"wiki_page": self.wiki_page.name}, "content_hash", "stale")
+
+		artifact = get_artifact(self.wiki_page)
+		self.assertEqual(artifact.links, [{"tag": "a", "url": "https://frappe.io/docs"}])
+		self.assertEqual(self.get_stored(), get_content_hash(self.wiki_page.title, self.wiki_page.content))
+
+	def test_stale_artifact_not_written_on_page_view(self):
+		frappe.db.set_value("Wiki Page Artifact", {"wiki_page": self.wiki_page.name}, "content_hash", "stale")
+		set_request(method="GET", path=f"/{self.wiki_page.route}")
+
+		artifact = get_artifact(self.wiki_page)
+		self.assertEqual(
+			artifact.content_hash, get_content_hash(self.wiki_page.title, self.wiki_page.content)
+		)
+		self.assertEqual(self.get_stored(), "stale")
+
+	def test_get_artifacts(self):
+		frappe.db.delete("Wiki Page Artifact", {"wiki_page": self.wiki_page.name})
+
+		artifacts = get_artifacts(
+			frappe.get_all(
+				"Wiki Page", filters={"name": self.wiki_page.name}, fields=["name", "title", "content"]
+			)
+		)
+		self.assertEqual(list(artifacts), [self.wiki_page.name])
+		self.assertEqual(artifacts[self.wiki_page.name].plain_text, "Intro Read the docs first.")
+		self.assertTrue(self.get_stored())
@@ -0,0 +1,174 @@
+# Copyright (c) 2026, Frappe and contributors
+# For license information, please see license.txt
+
+import hashlib
+import json
+import re
+
+import frappe
+from frappe.model.document import Document
+
+ARTIFACT_FIELDS = [
+	"wiki_page",
+	"content_hash",
+	"html",
+	"toc_html",
+	"plain_text",
+	"headings",
+	"links",
+	"word_count",
+]
+
+
+class WikiPageArtifact(Document):
+	pass
+
+
+def get_content_hash(title: str | None, content: str | None) -> str:
+	"""Hash of everything the artifacts are derived from, the title is part of the TOC"""
+	return hashlib.sha256(f"{title or ''}\0{content or ''}".encode()).hexdigest()
+
+
+def compute_artifact(wiki_page) -> dict:
+	from bs4 import BeautifulSoup
+
+	html = frappe.utils.md_to_html(wiki_page.content or "")
+	soup = BeautifulSoup(html, "html.parser")
+
+	headings = []
+	for heading in soup.find_all(["h1", "h2", "h3", "h4", "h5", "h6"]):
+		title = heading.get_text().strip()
+		headings.append(
+			{
+				"level": int(heading.name[1]),
+				"title": title,
+				"id": re.sub(r"[^\u00C0-\u1FFF\u2C00-\uD7FF\w\- ]", "", title).replace(" ", "-").lower(),
+			}
+		)
+
+	plain_text = soup.get_text(" ", strip=True)
+
+	return {
+		"content_hash": get_content_hash(wiki_page.title, wiki_page.content),
+		"html": html,
+		"toc_html": wiki_page.calculate_toc_html(html),
+		"plain_text": plain_text,
+		"headings": json.dumps(headings),
+		"links": json.dumps(extract_links(soup)),
+		"word_count": len(plain_text.split()),
+	}
+
+
+def extract_links(html) -> list[dict]:
+	"""Return anchors followed by images, in document order, as `{"tag", "url"}` dicts"""
+	from bs4 import BeautifulSoup
+
+	soup = html if isinstance(html, BeautifulSoup) else BeautifulSoup(html, "html.parser")
+
+	links = []
+	for tag, attr in (("a", "href"), ("img", "src")):
+		for el in soup.find_all(tag):
+			if url := el.attrs.get(attr):
+				links.append({"tag": tag, "url": url})
+
+	return links
+
+
+def build_artifact(wiki_page) -> frappe._dict:
+	"""Derive and store the artifacts for `wiki_page`, called from `WikiPage.on_update`"""
+	values = compute_artifact(wiki_page)
+
+	if name := frappe.db.get_value("Wiki Page Artifact", {"wiki_page": wiki_page.name}):
+		frappe.db.set_value("Wiki Page Artifact", name, values, update_modified=False)
+	else:
+		frappe.get_doc({"doctype": "Wiki Page Artifact", "wiki_page": wiki_page.name, **values}).insert(
+			ignore_permissions=True
+		)
+
+	return _parse(frappe._dict(values, wiki_page=wiki_page.name))
+
+
+def get_artifact(wiki_page) -> frappe._dict:
+	"""Return the stored artifacts for `wiki_page`, rebuilding them if they are missing or stale"""
+	artifact = frappe.db.get_value(
+		"Wiki Page Artifact", {"wiki_page": wiki_page.name}, ARTIFACT_FIELDS, as_dict=True
+	)
+
+	if not artifact or artifact.content_hash != get_content_hash(wiki_page.title, wiki_page.content):
+		return refresh_artifact(wiki_page)
+
+	return _parse(artifact)
+
+
+def get_artifacts(wiki_pages: list) -> dict[str, frappe._dict]:
+	"""Bulk version of `get_artifact`, `wiki_pages` need `name`, `title` and `content`"""
+	if not wiki_pages:
+		return {}
+
+	stored = {
+		d.wiki_page: d
+		for d in frappe.get_all(
+			"Wiki Page Artifact",
+			filters={"wiki_page": ["in", [page.name for page in wiki_pages]]},
+			fields=ARTIFACT_FIELDS,
+		)
+	}
+
+	artifacts = {}
+	for page in wiki_pages:
+		artifact = stored.get(page.name)
+		if not artifact or artifact.content_hash != get_content_hash(page.title, page.content):
+			artifacts[page.name] = refresh_artifact(frappe.get_doc("Wiki Page", page.name))
+		else:
+			artifacts[page.name] = _parse(artifact)
+
+	return artifacts
+
+
+def refresh_artifact(wiki_page) -> frappe._dict:
+	"""
+	Artifacts of `wiki_page` for when the stored ones are missing or stale. Page
+	views (GET requests) don't write to the database: they compute the artifacts
+	and leave storing them to a background job.
+	"""
+	request = getattr(frappe.local, "request", None)
+	if request and request.method in ("GET", "HEAD"):
+		frappe.enqueue(
+			build_artifact_for_page,
+			queue="long",
+			job_id=f"wiki_page_artifact:{wiki_page.name}",
+			deduplicate=True,
+			wiki_page_name=wiki_page.name,
+		)
+		return _parse(frappe._dict(compute_artifact(wiki_page), wiki_page=wiki_page.name))
+
+	return build_artifact(wiki_page)
+
+
+def build_artifact_for_page(wiki_page_name: str):
+	if frappe.db.exists("Wiki Page", wiki_page_name):
+		build_artifact(frappe.get_doc("Wiki Page", wiki_page_name))
+
+
+def delete_artifact(wiki_page_name: str):
+	frappe.db.delete("Wiki Page Artifact", {"wiki_page": wiki_page_name})
+
+
+def backfill_artifacts_in_background():
+	frappe.enqueue(backfill_artifacts, queue="long", job_id="wiki_page_artifact_backfill", deduplicate=True)
+
+
+def backfill_artifacts():
+	"""Build artifacts for every Wiki Page that has none or has stale ones"""
+	hashes = dict(frappe.get_all("Wiki Page Artifact", fields=["wiki_page", "content_hash"], as_list=True))
+
+	for page in frappe.get_all("Wiki Page", fields=["name", "title", "content"]):
+		if hashes.get(page.name) != get_content_hash(page.title, page.content):
+			build_artifact(frappe.get_doc("Wiki Page", page.name))
+			frappe.db.commit()
+
+
+def _parse(artifact: frappe._dict) -> frappe._dict:
+	artifact.headings = frappe.parse_json(artifact.headings or "[]")
+	artifact.links = frappe.parse_json(artifact.links or "[]")
+	return artifact
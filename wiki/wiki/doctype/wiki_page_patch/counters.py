@@ -0,0 +1,146 @@
+# Copyright (c) 2026, Frappe and contributors
+# For license information, please see license.txt
+
+"""
+Badge counts of Wiki Page Patches kept in Redis:
+
+- `contributions:<user>`: patches raised by the user that are Under Review
+- `drafts:<user>`: drafts owned by the user
+- `pending:<space>`: patches Under Review for pages of the space
+
+Counters move by one on every status transition of a patch and are counted
+from the database only when missing. `reconcile_patch_counters` recounts
+all of them daily to undo any drift.
+"""
+
+import frappe
+from frappe.utils import cint
+
+from wiki.wiki.doctype.wiki_page.sidebar import get_space_of_page
+
+COUNTER_PREFIX = "wiki_patch_count"
+CONTRIBUTIONS = "contributions"
+DRAFTS = "drafts"
+PENDING = "pending"
+COUNTER_TTL = 2 * 24 * 60 * 60
+
+# counters that are missing are unknown rather than 0, only move the ones that are there
+INCREMENT_IF_EXISTS = """
+if redis.call("EXISTS", KEYS[1]) == 1 then
+	return redis.call("INCRBY", KEYS[1], ARGV[1])
+end
+"""
+
+
+def get_counter_key(kind: str, name: str) -> str:
+	return frappe.cache.make_key(f"{COUNTER_PREFIX}:{kind}:{name}")
+
+
+def get_patch_count(kind: str, name: str | None) -> int:
+	if not name:
+		return 0
+
+	key = get_counter_key(kind, name)
+	count = frappe.cache.get(key)
+	if count is None:
+		count = count_patches(kind, name)
+		frappe.cache.set(key, count, ex=COUNTER_TTL, nx=True)
+
+	return cint(count)
+
+
+def count_patches(kind: str, name: str) -> int:
+	if kind == CONTRIBUTIONS:
+		return frappe.db.count("Wiki Page Patch", {"status": "Under Review", "raised_by": name})
+
+	if kind == DRAFTS:
+		return frappe.db.count("Wiki Page Patch", {"status": "Draft", "owner": name})
+
+	return frappe.db.sql(
+		"""
+		SELECT COUNT(*)
+		FROM `tabWiki Page Patch` patch
+		INNER JOIN `tabWiki Group Item` item ON item.wiki_page = patch.wiki_page
+		WHERE item.parent = %s AND item.parenttype = 'Wiki Space' AND patch.status = 'Under Review'
+		""",
+		name,
+	)[0][0]
+
+
+def get_patch_counters(patch) -> set[tuple[str, str]]:
+	"""Counters `patch` adds one to in its current state"""
+	if not patch:
+		return set()
+
+	if patch.status == "Draft":
+		return {(DRAFTS, patch.owner)}
+
+	if patch.status == "Under Review":
+		counters = {(CONTRIBUTIONS, patch.raised_by)}
+		if space := get_space_of_page(patch.wiki_page):
+			counters.add((PENDING, space))
+		return counters
+
+	return set()
+
+
+def update_patch_counters(patch, deleted: bool = False):
+	"""Move the counters affected by the last status transition of `patch` once it is committed"""
+	# a deleted patch takes back what it counted for in its last state
+	before = get_patch_counters(patch if deleted else patch.get_doc_before_save())
+	after = set() if deleted else get_patch_counters(patch)
+
+	deltas = {counter: -1 for counter in before - after}
+	deltas.update({counter: 1 for counter in after - before})
+	if deltas:
+		frappe.db.after_commit.add(lambda: _apply_deltas(deltas))
+
+
+def _apply_deltas(deltas: dict):
+	pipeline = frappe.cache.pipeline()
+	for (kind, name), delta in deltas.items():
+		if name:
+			pipeline.eval(INCREMENT_IF_EXISTS, 1, get_counter_key(kind, name), delta)
+	pipeline.execute()
+
+
+def reconcile_patch_counters():
+	"""Recount every counter from the database, run daily"""
+	counts = {}
+	for raised_by, count in frappe.get_all(
+		"Wiki Page Patch",
+		filters={"status": "Under Review"},
+		fields=["raised_by", "count(name) as count"],
+		group_by="raised_by",
+		as_list=True,
+	):
+		counts[(CONTRIBUTIONS, raised_by)] = count
+
+	for owner, count in frappe.get_all(
+		"Wiki Page Patch",
+		filters={"status": "Draft"},
+		fields=["owner", "count(name) as count"],
+		group_by="owner",
+		as_list=True,
+	):
+		counts[(DRAFTS, owner)] = count
+
+	for space, count in frappe.db.sql(
+		"""
+		SELECT item.parent, COUNT(*)
+		FROM `tabWiki Page Patch` patch
+		INNER JOIN `tabWiki Group Item` item ON item.wiki_page = patch.wiki_page
+		WHERE item.parenttype = 'Wiki Space' AND patch.status = 'Under Review'
+		GROUP BY item.parent
+		"""
+	):
+		counts[(PENDING, space)] = count
+
+	# counters that dropped to zero have no row above, clear them so they are counted again
+	frappe.cache.delete_keys(f"{COUNTER_PREFIX}:")
+
+	pipeline = frappe.cache.pipeline()
+	for (kind, name), count in counts.items():
+		if name:
+			pipeline.set(get_counter_key(kind, name), count, ex=COUNTER_TTL)
+	pipeline.execute()
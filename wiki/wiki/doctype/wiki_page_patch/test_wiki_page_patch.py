@@ -1,9 +1,155 @@
 # Copyright (c) 2021, Frappe and Contributors
 # See license.txt
 
-# import frappe
 import unittest
 
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from wiki.utils import diff_lines, get_opcodes, highlight_diff, merge3
+from wiki.wiki.doctype.wiki_page_patch.counters import (
+	CONTRIBUTIONS,
+	COUNTER_PREFIX,
+	DRAFTS,
+	PENDING,
+	get_counter_key,
+	get_patch_count,
+	reconcile_patch_counters,
+)
+
 
 class TestWikiPagePatch(unittest.TestCase):
-	pass
+	def setUp(self):
+		self.base = "\n".join(f"Paragraph {i}" for i in range(10))
+
+	def test_merge_keeps_changes_of_both_sides(self):
+		current = self.base.replace("Paragraph 2", "Paragraph two")
+		patch = self.base.replace("Paragraph 7", "Paragraph seven") + "\nAppendix"
+
+		merged = merge3(self.base, current, patch)
+
+		self.assertFalse(merged.conflicts)
+		self.assertIn("Paragraph two", merged.content)
+		self.assertIn("Paragraph seven", merged.content)
+		self.assertTrue(merged.content.endswith("Appendix"))
+
+	def test_merge_detects_conflicts(self):
+		current = self.base.replace("Paragraph 2", "Paragraph two")
+		patch = self.base.replace("Paragraph 2", "Paragraph 2!")
+
+		merged = merge3(self.base, current, patch)
+
+		self.assertEqual(len(merged.conflicts), 1)
+		self.assertEqual(merged.conflicts[0]["base_lines"], (3, 3))
+		self.assertEqual(merged.conflicts[0]["current"], ["Paragraph two"])
+		self.assertEqual(merged.conflicts[0]["patch"], ["Paragraph 2!"])
+
+		# both sides making the same change is no conflict
+		self.assertFalse(merge3(self.base, current, current).conflicts)
+
+	def test_highlight_diff(self):
+		diff = highlight_diff("# Title\nThe quick fox\nOld <b>line</b>", "# Title\nThe slow fox\nNew line")
+
+		self.assertEqual(
+			diff.split("\n"),
+			[
+				"# Title",
+				"The <del>quick</del><ins>slow</ins> fox",
+				"<del>Old</del><ins>New</ins> <del>&lt;b&gt;line&lt;/b&gt;</del><ins>line</ins>",
+			],
+		)
+		self.assertEqual(highlight_diff("", "New page"), "<ins>New page</ins>")
+
+	def test_opcodes_rebuild_new_text(self):
+		a = ["| a |", "| b |", "| a |", "x", "| b |"] * 20
+		b = a[:5] + ["y"] + a[7:60] + ["| a |"] * 3 + a[60:]
+
+		rebuilt = []
+		for tag, i1, i2, j1, j2 in get_opcodes(a, b):
+			if tag == "equal":
+				self.assertEqual(a[i1:i2], b[j1:j2])
+			rebuilt.extend(b[j1:j2])
+
+		self.assertEqual(rebuilt, b)
+
+	def test_merge_large_page(self):
+		# tables and code fences repeat the same lines over and over
+		lines = []
+		for i in range(6000):
+			lines.append(f"Paragraph {i}" if i % 3 == 0 else "| --- | --- |")
+			if i % 50 == 0:
+				lines.append("```")
+
+		current = lines[:]
+		current[100] = "Changed"
+		current.insert(3000, "Inserted")
+		patch = lines[:]
+		patch[5000] = "Patched"
+		del patch[4000:4010]
+
+		merged = merge3("\n".join(lines), "\n".join(current), "\n".join(patch))
+
+		expected = current[:]
+		expected[5001] = "Patched"
+		del expected[4001:4011]
+		self.assertFalse(merged.conflicts)
+		self.assertEqual(merged.content, "\n".join(expected))
+
+		# nothing in common, everything is replaced at once
+		self.assertEqual(list(get_opcodes(["x"] * 5000, ["y"] * 5000)), [("replace", 0, 5000, 0, 5000)])
+		self.assertEqual(diff_lines(["x"] * 5000, ["y"] * 5000), [])
+
+
+class TestPatchCounters(FrappeTestCase):
+	def setUp(self):
+		self.space = frappe.get_doc({"doctype": "Wiki Space", "route": "test-counters"}).insert()
+		self.wiki_page = self.space.wiki_sidebars[0].wiki_page
+		frappe.cache.delete_keys(f"{COUNTER_PREFIX}:")
+		# counters only move once they have been counted
+		self.initial = self.get_counts()
+
+	def tearDown(self):
+		frappe.delete_doc("Wiki Page", self.wiki_page)
+		frappe.delete_doc("Wiki Space", self.space.name)
+
+	def get_counts(self):
+		return (
+			get_patch_count(DRAFTS, "Administrator"),
+			get_patch_count(CONTRIBUTIONS, "Administrator"),
+			get_patch_count(PENDING, self.space.name),
+		)
+
+	def assertCountsMoved(self, drafts, contributions, pending):
+		frappe.db.commit()
+		initial = self.initial
+		self.assertEqual(
+			self.get_counts(), (initial[0] + drafts, initial[1] + contributions, initial[2] + pending)
+		)
+
+	def test_counters_follow_status(self):
+		patch = frappe.get_doc(
+			{
+				"doctype": "Wiki Page Patch",
+				"wiki_page": self.wiki_page,
+				"status": "Draft",
+				"raised_by": "Administrator",
+				"new_code": "Draft content",
+				"new_title": "New Wiki Page",
+				"message": "test",
+			}
+		).insert()
+		self.assertCountsMoved(1, 0, 0)
+
+		patch.status = "Under Review"
+		patch.save()
+		self.assertCountsMoved(0, 1, 1)
+
+		patch.delete()
+		self.assertCountsMoved(0, 0, 0)
+
+	def test_reconcile_patch_counters(self):
+		frappe.cache.set(get_counter_key(DRAFTS, "Administrator"), 999)
+		frappe.cache.set(get_counter_key(PENDING, self.space.name), 999)
+
+		reconcile_patch_counters()
+		self.assertEqual(self.get_counts(), self.initial)
@@ -10,6 +10,16 @@ frappe.ui.form.on("Wiki Page Patch", {
       .parent(".like-disabled-input")
       .html(frm.doc.new_code);
 
+    if (frm.doc.apply_status === "Failed")
+      frm.add_custom_button(__("Retry"), () =>
+        frappe.call({
+          method:
+            "wiki.wiki.doctype.wiki_page_patch.wiki_page_patch.retry_apply",
+          args: { patch: frm.doc.name },
+          callback: () => frm.reload_doc(),
+        }),
+      );
+
     if (!frm.doc.new && !frm.doc.__unsaved)
       frappe.call({
         method: "wiki.wiki.doctype.wiki_page.wiki_page.preview",
@@ -20,21 +30,49 @@ frappe.ui.form.on("Wiki Page Patch", {
         },
         callback: (r) => {
           if (r.message) {
-            $(".wiki-diff").append(r.message);
-            $(".wiki-diff").append(
-              `<style>
-                del {
-                    background-color: #fee2e2;
-                    text-decoration: none;
-                }
-                ins {
-                    background-color:  #dcfce7;
-                    text-decoration: none;
-                }
-             </style>`,
-            );
+            show_preview(r.message);
           }
         },
       });
   },
 });
+
+// large diffs are built in the background, poll until they are ready
+function show_preview(result, attempts = 0) {
+  if (result.html !== undefined) {
+    $(".wiki-diff").append(result.html);
+    $(".wiki-diff").append(
+      `<style>
+        del {
+            background-color: #fee2e2;
+            text-decoration: none;
+        }
+        ins {
+            background-color:  #dcfce7;
+            text-decoration: none;
+        }
+     </style>`,
+    );
+    return;
+  }
+
+  if (attempts >= 60) {
+    $(".wiki-diff").html(
+      `<p class="text-muted">${__("The preview is taking longer than expected.")}
+        <a class="retry-preview">${__("Check again")}</a></p>`,
+    );
+    $(".wiki-diff .retry-preview").on("click", () => {
+      $(".wiki-diff").empty();
+      show_preview(result);
+    });
+    return;
+  }
+
+  setTimeout(() => {
+    frappe.call({
+      method: "wiki.wiki.doctype.wiki_page.wiki_page.get_preview",
+      args: { key: result.key },
+      callback: (r) => r.message && show_preview(r.message, attempts + 1),
+    });
+  }, 1000);
+}
@@ -2,6 +2,7 @@
 # For license information, please see license.txt
 
 
+import hashlib
 import json
 import re
 
@@ -11,18 +12,39 @@ from frappe.desk.form.utils import add_comment
 from frappe.model.document import Document
 from frappe.website.utils import cleanup_page_name
 
-from wiki.utils import apply_changes, apply_markdown_diff, highlight_changes
+from wiki.cache import defer_invalidation, run_deferred
+from wiki.utils import merge3
+from wiki.wiki.doctype.wiki_page.search import build_index_in_background
+from wiki.wiki.doctype.wiki_page.sidebar import (
+	clear_sidebar_cache,
+	get_space_of_page,
+	rebuild_navigation,
+	reorder_sidebar_items,
+)
+from wiki.wiki.doctype.wiki_page_patch.counters import update_patch_counters
 
 
 class WikiPagePatch(Document):
 	def before_save(self):
-		if not self.new:
+		# the content the patch was made from is the base of the merge on approval, keep it once set
+		if not self.new and not self.orignal_code:
 			self.orignal_code = frappe.db.get_value("Wiki Page", self.wiki_page, "content")
 
 	def after_insert(self):
 		add_comment_to_patch(self.name, self.message)
 		frappe.db.commit()
 
+	def on_change(self):
+		# runs on submit and cancel too, which `on_update` doesn't
+		update_patch_counters(self)
+
+	def on_trash(self):
+		update_patch_counters(self, deleted=True)
+
+	def before_submit(self):
+		if self.status == "Approved":
+			self.apply_status = "Queued"
+
 	def on_submit(self):
 		if self.status == "Rejected":
 			return
@@ -31,6 +53,24 @@ class WikiPagePatch(Document):
 			frappe.throw(_("Please approve/ reject the request before submitting"))
 
 		self.wiki_page_doc = frappe.get_doc("Wiki Page", self.wiki_page)
+		batch = frappe.flags.wiki_patch_batch
+
+		# merging is cheap, refuse conflicting patches right away rather than in the background
+		if not self.new:
+			# in a batch, earlier patches to the page are applied before this one
+			current_md = batch.contents.get(self.wiki_page) if batch else None
+			merged = self.get_merged_content(current_md)
+			if batch:
+				batch.contents[self.wiki_page] = merged
+
+		if batch:
+			batch.patches.append(self.name)
+		else:
+			enqueue_apply_patches([self.name])
+
+	def apply(self):
+		"""Write the approved changes to the wiki, see `apply_patch`"""
+		self.wiki_page_doc = frappe.get_doc("Wiki Page", self.wiki_page, for_update=True)
 
 		self.clear_sidebar_cache()
 
@@ -42,8 +82,11 @@ class WikiPagePatch(Document):
 
 	def clear_sidebar_cache(self):
 		if self.new or self.new_title != self.wiki_page_doc.title:
-			for key in frappe.cache().hgetall("wiki_sidebar").keys():
-				frappe.cache().hdel("wiki_sidebar", key)
+			if space := get_space_of_page(self.wiki_page):
+				clear_sidebar_cache(space)
+
+	def get_new_page_route(self):
+		return f"{self.wiki_page_doc.get_space_route()}/{cleanup_page_name(self.new_title)}"
 
 	def create_new_wiki_page(self):
 		self.new_wiki_page = frappe.new_doc("Wiki Page")
@@ -51,7 +94,7 @@ class WikiPagePatch(Document):
 		wiki_page_dict = {
 			"title": self.new_title,
 			"content": self.new_code or "content",
-			"route": f"{self.wiki_page_doc.get_space_route()}/{cleanup_page_name(self.new_title)}",
+			"route": self.get_new_page_route(),
 			"published": 1,
 			"allow_guest": self.wiki_page_doc.allow_guest,
 		}
@@ -59,15 +102,27 @@ class WikiPagePatch(Document):
 		self.new_wiki_page.update(wiki_page_dict)
 		self.new_wiki_page.save()
 
-	def update_old_page(self):
-		original_md = self.wiki_page_doc.content or ""
-		modified_md = self.new_code or ""
+	def get_merged_content(self, current_md: str | None = None):
+		if current_md is None:
+			current_md = self.wiki_page_doc.content or ""
+		merged = merge3(self.orignal_code or current_md, current_md, self.new_code or "")
 
-		merge_old_content = apply_markdown_diff(self.orignal_code, modified_md)[1]
-		merge_new_content = apply_changes(original_md, merge_old_content)
-		new_modified_md = apply_markdown_diff(original_md, merge_new_content)[0]
+		if merged.conflicts:
+			lines = ", ".join(
+				f"{start}-{end}" if end > start else str(start)
+				for start, end in (conflict["base_lines"] for conflict in merged.conflicts)
+			)
+			frappe.throw(
+				_("The page was changed since this patch was made, lines {0} conflict with it").format(lines),
+				title=_("Merge Conflict"),
+			)
 
-		self.wiki_page_doc.update_page(self.new_title, new_modified_md, self.message, self.raised_by)
+		return merged.content
+
+	def update_old_page(self):
+		self.wiki_page_doc.update_page(
+			self.new_title, self.get_merged_content(), self.message, self.raised_by
+		)
 
 	def update_sidebars(self):
 		if not hasattr(self, "new_sidebar_items") or not self.new_sidebar_items:
@@ -75,35 +130,115 @@ class WikiPagePatch(Document):
 			return
 
 		sidebars = json.loads(self.new_sidebar_items)
+		for items in sidebars.values():
+			for item in items:
+				if item["name"] == "new-wiki-page":
+					item["name"] = self.new_wiki_page.name
+					self.insert_on_sidebar(list(sidebars)[-1], self.new_wiki_page.name)
 
-		sidebar_items = sidebars.items()
-		if sidebar_items:
-			idx = 0
-			for sidebar, items in sidebar_items:
-				for item in items:
-					idx += 1
-					if item["name"] == "new-wiki-page":
-						item["name"] = self.new_wiki_page.name
-						self.insert_on_sidebar(list(sidebars)[-1], self.new_wiki_page.name)
-
-					frappe.db.set_value(
-						"Wiki Group Item",
-						{"wiki_page": str(item["name"])},
-						{"parent_label": sidebar, "idx": idx},
-					)
+		reorder_sidebar_items(sidebars)
 
 	def insert_on_sidebar(self, parent_label: str, wiki_page: str):
-		wiki_space_name = frappe.get_value("Wiki Space", {"route": self.wiki_page_doc.get_space_route()})
+		# insert the row alone, saving the whole Wiki Space is slow on large spaces
+		space = get_space_of_page(self.wiki_page)
+		if not space:
+			return
 
-		wiki_space = frappe.get_doc("Wiki Space", wiki_space_name)
-		wiki_space.append(
-			"wiki_sidebars",
+		idx = frappe.db.sql(
+			"SELECT COALESCE(MAX(idx), 0) FROM `tabWiki Group Item` WHERE parent = %s AND parenttype = 'Wiki Space'",
+			space,
+		)[0][0]
+		frappe.get_doc(
 			{
+				"doctype": "Wiki Group Item",
+				"parent": space,
+				"parenttype": "Wiki Space",
+				"parentfield": "wiki_sidebars",
+				"idx": idx + 1,
 				"wiki_page": wiki_page,
 				"parent_label": parent_label,
-			},
-		)
-		wiki_space.save()
+			}
+		).db_insert()
+
+		clear_sidebar_cache(space)
+		rebuild_navigation(space)
+		run_deferred("build_index", build_index_in_background)
+
+
+def enqueue_apply_patches(patches: list[str]):
+	frappe.enqueue(
+		apply_patches,
+		queue="long",
+		job_id=f"wiki_page_patch_apply:{hashlib.sha1(','.join(patches).encode()).hexdigest()}",
+		deduplicate=True,
+		enqueue_after_commit=True,
+		now=frappe.flags.in_test,
+		patches=patches,
+	)
+
+
+def apply_patches(patches: list[str]):
+	"""Apply approved patches in order, refreshing caches and the search index once for all of them"""
+	with defer_invalidation():
+		for patch in patches:
+			apply_patch(patch)
+
+
+def apply_patch(patch: str):
+	"""
+	Apply an approved patch, safe to retry: the changes and the `Applied`
+	status are committed together, and applied patches are skipped
+	"""
+	if frappe.db.get_value("Wiki Page Patch", patch, "apply_status", for_update=True) != "Queued":
+		return
+
+	patch_doc = frappe.get_doc("Wiki Page Patch", patch)
+	frappe.db.savepoint("apply_wiki_page_patch")
+	try:
+		patch_doc.apply()
+	except Exception as e:
+		frappe.db.rollback(save_point="apply_wiki_page_patch")
+		frappe.clear_last_message()
+		frappe.log_error(f"Could not apply Wiki Page Patch {patch}", reference_doctype="Wiki Page Patch")
+		set_apply_status(patch, "Failed", str(e))
+	else:
+		set_apply_status(patch, "Applied")
+
+	if not frappe.flags.in_test:
+		frappe.db.commit()
+
+
+def set_apply_status(patch: str, status: str, error: str | None = None):
+	frappe.db.set_value(
+		"Wiki Page Patch", patch, {"apply_status": status, "apply_error": error}, update_modified=False
+	)
+
+
+@frappe.whitelist()
+def get_apply_status(patch):
+	"""Polled by the editor until an approved patch is applied"""
+	frappe.has_permission("Wiki Page Patch", "read", patch, throw=True)
+
+	patch_doc = frappe.get_doc("Wiki Page Patch", patch)
+	patch_doc.wiki_page_doc = frappe.get_doc("Wiki Page", patch_doc.wiki_page)
+
+	return {
+		"status": patch_doc.apply_status,
+		"error": patch_doc.apply_error,
+		"route": patch_doc.get_new_page_route() if patch_doc.new else patch_doc.wiki_page_doc.route,
+	}
+
+
+@frappe.whitelist()
+def retry_apply(patch):
+	"""Queue a patch that could not be applied again"""
+	frappe.has_permission("Wiki Page Patch", "submit", patch, throw=True)
+
+	if frappe.db.get_value("Wiki Page Patch", patch, "apply_status") != "Failed":
+		frappe.throw(_("Only patches that failed to apply can be retried"))
+
+	set_apply_status(patch, "Queued")
+	enqueue_apply_patches([patch])
 
 
 @frappe.whitelist()
@@ -113,3 +248,10 @@ def add_comment_to_patch(reference_name, content):
 	comment = add_comment("Wiki Page Patch", reference_name, content, email, name)
 	comment.timepassed = frappe.utils.pretty_date(comment.creation)
 	return comment
+
+
+def on_doctype_update():
+	# listings are ordered by (modified, name) and read with a keyset cursor, see `get_patch_listing`
+	frappe.db.add_index("Wiki Page Patch", ["status", "modified", "name"])
+	frappe.db.add_index("Wiki Page Patch", ["owner", "status", "modified", "name"])
+	frappe.db.add_index("Wiki Page Patch", ["wiki_page", "status"])
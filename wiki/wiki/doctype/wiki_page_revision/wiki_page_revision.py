@@ -6,6 +6,8 @@ import frappe
 from frappe.model.document import Document
 from frappe.utils import md_to_html, pretty_date
 
+ORPHAN_BATCH_SIZE = 1000
+
 
 class WikiPageRevision(Document):
 	pass
@@ -29,3 +31,28 @@ def get_revisions(wiki_page_name):
 		del revision.owner
 
 	return revisions
+
+
+def delete_orphan_revisions(batch_size: int = ORPHAN_BATCH_SIZE):
+	"""Delete revisions no page links to anymore, left behind by deleted pages, run daily"""
+	while True:
+		orphans = frappe.db.sql_list(
+			"""
+			SELECT revision.name
+			FROM `tabWiki Page Revision` revision
+			LEFT JOIN `tabWiki Page Revision Item` item
+				ON item.parent = revision.name AND item.parenttype = 'Wiki Page Revision'
+			WHERE item.name IS NULL
+			LIMIT %s
+			""",
+			batch_size,
+		)
+		if not orphans:
+			return
+
+		frappe.db.delete("Wiki Page Revision", {"name": ["in", orphans]})
+		if not frappe.flags.in_test:
+			frappe.db.commit()
+
+		if len(orphans) < batch_size:
+			return
@@ -1,9 +1,14 @@
 # Copyright (c) 2022, Frappe and contributors
 # For license information, please see license.txt
 
-# import frappe
+import frappe
 from frappe.model.document import Document
 
 
 class WikiPageRevisionItem(Document):
 	pass
+
+
+def on_doctype_update():
+	# revisions of a page are looked up and deleted by `wiki_page`, see `WikiPage.on_trash`
+	frappe.db.add_index("Wiki Page Revision Item", ["wiki_page"])
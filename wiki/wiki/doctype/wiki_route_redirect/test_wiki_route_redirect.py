@@ -0,0 +1,55 @@
+# Copyright (c) 2026, Frappe and Contributors
+# See license.txt
+
+import frappe
+from frappe.tests.utils import FrappeTestCase
+
+from wiki.wiki.doctype.wiki_page.wiki_renderer import WikiPageRenderer
+from wiki.wiki.doctype.wiki_route_redirect.wiki_route_redirect import get_route_redirect
+
+
+class TestWikiRouteRedirect(FrappeTestCase):
+	def setUp(self):
+		self.space = frappe.get_doc({"doctype": "Wiki Space", "route": "test-move-v1"}).insert()
+		self.page = self.space.wiki_sidebars[0].wiki_page
+
+	def tearDown(self):
+		frappe.delete_doc("Wiki Page", self.page)
+		frappe.delete_doc("Wiki Space", self.space.name)
+
+	def test_route_change_leaves_redirects(self):
+		self.space.route = "test-move-v2"
+		self.space.save()
+		self.space.route = "test-move-v3"
+		self.space.save()
+
+		self.assertEqual(frappe.db.get_value("Wiki Page", self.page, "route"), "test-move-v3/new-wiki-page")
+		self.assertEqual(get_route_redirect("test-move-v1/new-wiki-page"), "test-move-v3/new-wiki-page")
+		self.assertEqual(get_route_redirect("test-move-v2/new-wiki-page"), "test-move-v3/new-wiki-page")
+		self.assertIsNone(get_route_redirect("test-move-v3/new-wiki-page"))
+
+	def test_redirects_follow_page_route(self):
+		self.space.route = "test-move-v2"
+		self.space.save()
+
+		page = frappe.get_doc("Wiki Page", self.page)
+		page.route = "test-move-v2/renamed"
+		page.save()
+		self.assertEqual(get_route_redirect("test-move-v1/new-wiki-page"), "test-move-v2/renamed")
+
+		# moving back onto a redirected route makes the page live there again
+		page.route = "test-move-v1/new-wiki-page"
+		page.save()
+		self.assertIsNone(get_route_redirect("test-move-v1/new-wiki-page"))
+
+	def test_redirect_only_to_published_pages(self):
+		self.space.route = "test-move-v2"
+		self.space.save()
+		frappe.db.set_value("Wiki Page", self.page, "published", 0)
+
+		renderer = WikiPageRenderer(path="test-move-v1/new-wiki-page")
+		self.assertFalse(renderer.can_render())
+
+		frappe.db.set_value("Wiki Page", self.page, "published", 1)
+		with self.assertRaises(frappe.Redirect):
+			renderer.can_render()
@@ -0,0 +1,106 @@
+# Copyright (c) 2026, Frappe and contributors
+# For license information, please see license.txt
+
+import pickle
+
+import frappe
+from frappe.model.document import Document
+
+# source -> target of every redirect, see `get_route_redirect`
+REDIRECTS_CACHE = "wiki_route_redirects"
+# field marking the hash as built, sources missing from it have no redirect
+BUILT = "\0built"
+
+
+class WikiRouteRedirect(Document):
+	def on_update(self):
+		clear_route_redirects_cache()
+
+	def on_trash(self):
+		clear_route_redirects_cache()
+
+
+def get_route_redirect(route: str) -> str | None:
+	"""Route `route` moved to, looked up in a Redis hash so that unknown routes cost one HGET"""
+	target = frappe.cache.hget(REDIRECTS_CACHE, route)
+	if target is None and not frappe.cache.hget(REDIRECTS_CACHE, BUILT):
+		target = build_route_redirects_cache().get(route)
+
+	return target
+
+
+def build_route_redirects_cache() -> dict:
+	redirects = dict(frappe.get_all("Wiki Route Redirect", fields=["source", "target"], as_list=True))
+
+	# a single HSET for every redirect, values are pickled the way `frappe.cache.hget` expects them
+	pipeline = frappe.cache.pipeline()
+	pipeline.hset(
+		frappe.cache.make_key(REDIRECTS_CACHE),
+		mapping={key: pickle.dumps(value) for key, value in {**redirects, BUILT: True}.items()},
+	)
+	pipeline.execute()
+
+	return redirects
+
+
+def clear_route_redirects_cache():
+	frappe.cache.delete_value(REDIRECTS_CACHE)
+
+
+def delete_route_redirects(wiki_page: str):
+	if frappe.db.exists("Wiki Route Redirect", {"wiki_page": wiki_page}):
+		frappe.db.delete("Wiki Route Redirect", {"wiki_page": wiki_page})
+		clear_route_redirects_cache()
+
+
+def add_route_redirects(moves: dict[str, tuple[str, str]]):
+	"""
+	Redirect the old routes of moved pages to their new routes, `moves` maps
+	each page to its (old route, new route). Older redirects pointing at an old
+	route are pointed at the new one, so redirects never chain.
+	"""
+	moves = {page: (old, new) for page, (old, new) in moves.items() if old != new}
+	if not moves:
+		return
+
+	old_routes = [old for old, _new in moves.values()]
+	new_routes = [new for _old, new in moves.values()]
+
+	# the new routes are live pages now, and the old routes get a fresh redirect
+	frappe.db.delete("Wiki Route Redirect", {"source": ["in", old_routes + new_routes]})
+
+	retarget_route_redirects(list(moves))
+
+	now = frappe.utils.now()
+	frappe.db.bulk_insert(
+		"Wiki Route Redirect",
+		["name", "creation", "modified", "owner", "modified_by", "source", "target", "wiki_page"],
+		[
+			[frappe.generate_hash(), now, now, frappe.session.user, frappe.session.user, old, new, page]
+			for page, (old, new) in moves.items()
+		],
+		chunk_size=1000,
+	)
+
+	clear_route_redirects_cache()
+
+
+def update_page_redirects(wiki_page: str, route: str):
+	"""Follow a page that moved to `route` on its own, its redirects point there now"""
+	# the new route is a live page, a redirect away from it would shadow the page
+	frappe.db.delete("Wiki Route Redirect", {"source": route})
+	retarget_route_redirects([wiki_page])
+	clear_route_redirects_cache()
+
+
+def retarget_route_redirects(pages: list[str]):
+	"""Point the redirects of `pages` at their current routes"""
+	frappe.db.sql(
+		"""
+		UPDATE `tabWiki Route Redirect` redirect
+		INNER JOIN `tabWiki Page` page ON page.name = redirect.wiki_page
+		SET redirect.target = page.route
+		WHERE redirect.wiki_page IN %(pages)s
+		""",
+		{"pages": pages},
+	)
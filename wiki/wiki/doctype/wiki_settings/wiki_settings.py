@@ -3,13 +3,18 @@
 
 import frappe
 from frappe.model.document import Document
+from frappe.utils import create_batch
+
+from wiki.cache import SETTINGS, bump_cache_version
+from wiki.snapshot import clear_wiki_snapshot
+from wiki.wiki.doctype.wiki_page.sidebar import clear_sidebar_cache
 
 
 class WikiSettings(Document):
 	def on_update(self):
-		for key in frappe.cache().hgetall("wiki_sidebar").keys():
-			frappe.cache().hdel("wiki_sidebar", key)
-
+		clear_sidebar_cache()
+		bump_cache_version(SETTINGS)
+		clear_wiki_snapshot()
 		clear_wiki_page_cache()
 
 
@@ -20,7 +25,17 @@ def get_all_spaces():
 
 @frappe.whitelist()
 def clear_wiki_page_cache():
-	for route in frappe.get_all("Wiki Page", pluck="route"):
-		frappe.cache().hdel("website_page", route)
+	from wiki.wiki.doctype.wiki_page.cache_warmup import warm_cache_in_background
+
+	# saving Wiki Settings clears it as well
+	frappe.has_permission("Wiki Settings", "write", throw=True)
+
+	# one round trip for every page instead of one per page
+	pipeline = frappe.cache.pipeline()
+	for routes in create_batch(frappe.get_all("Wiki Page", pluck="route"), 1000):
+		pipeline.hdel(frappe.cache.make_key("website_page"), *routes)
+	pipeline.execute()
+
+	warm_cache_in_background()
 
 	return True
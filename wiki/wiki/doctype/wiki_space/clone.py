@@ -0,0 +1,198 @@
+# Copyright (c) 2026, Frappe Technologies Pvt. Ltd. and Contributors
+# MIT License. See license.txt
+
+"""
+Cloning a Wiki Space into a new route, typically to start the docs of a new
+version. Pages, sidebar rows and revision rows are copied with batched
+inserts rather than by saving every document: the cloned pages keep the
+timestamps and authors of the originals and share their revision history.
+"""
+
+import frappe
+from frappe import _
+from frappe.utils import create_batch
+
+from wiki.cache import SPACES, bump_cache_version
+from wiki.wiki.doctype.wiki_page.search import build_index_in_background
+from wiki.wiki.doctype.wiki_page.sidebar import clear_sidebar_cache, rebuild_navigation
+from wiki.wiki.doctype.wiki_page_artifact.wiki_page_artifact import backfill_artifacts_in_background
+
+BATCH_SIZE = 500
+
+
+def clone_wiki_space(name, route, new_space_route):
+	if frappe.db.exists("Wiki Space", {"route": new_space_route}):
+		frappe.throw(_("Wiki Space <b>{0}</b> already exists.").format(new_space_route))
+
+	items = frappe.get_all(
+		"Wiki Group Item",
+		filters={"parent": name, "parenttype": "Wiki Space"},
+		fields=["wiki_page", "parent_label", "hide_on_sidebar"],
+		order_by="idx asc",
+	)
+	pages = {
+		page.name: page
+		for page in frappe.get_all(
+			"Wiki Page", filters={"name": ["in", [item.wiki_page for item in items]]}, fields=["*"]
+		)
+	}
+
+	# new names and routes of every page, checked against existing routes in one query
+	clones = {}
+	for page in pages.values():
+		clones[page.name] = frappe._dict(
+			name=frappe.generate_hash(), route=rewrite_route(page.route, route, new_space_route)
+		)
+
+	if taken := frappe.get_all(
+		"Wiki Page", filters={"route": ["in", [clone.route for clone in clones.values()]]}, pluck="route"
+	):
+		frappe.throw(_("Wiki Pages with routes {0} already exist.").format(", ".join(taken)))
+
+	progress = frappe._dict(route=new_space_route, total=len(pages) * 2 + len(items), done=0)
+
+	fields = list(next(iter(pages.values()), {}))
+	for batch in create_batch(list(pages.values()), BATCH_SIZE):
+		values = []
+		for page in batch:
+			clone = clones[page.name]
+			values.append([clone.get(field, page[field]) for field in fields])
+
+		frappe.db.bulk_insert("Wiki Page", fields, values)
+		publish_clone_progress(progress, len(batch))
+
+	clone_revision_items(clones, progress)
+
+	wiki_space = frappe.new_doc("Wiki Space")
+	wiki_space.route = new_space_route
+	wiki_space.flags.in_clone = True
+	wiki_space.insert()
+
+	now = frappe.utils.now()
+	frappe.db.bulk_insert(
+		"Wiki Group Item",
+		[
+			"name",
+			"creation",
+			"modified",
+			"owner",
+			"modified_by",
+			"parent",
+			"parenttype",
+			"parentfield",
+			"idx",
+			"wiki_page",
+			"parent_label",
+			"hide_on_sidebar",
+		],
+		[
+			[
+				frappe.generate_hash(),
+				now,
+				now,
+				frappe.session.user,
+				frappe.session.user,
+				wiki_space.name,
+				"Wiki Space",
+				"wiki_sidebars",
+				idx,
+				clones[item.wiki_page].name,
+				item.parent_label,
+				item.hide_on_sidebar,
+			]
+			for idx, item in enumerate(items, 1)
+			if item.wiki_page in clones
+		],
+		chunk_size=BATCH_SIZE,
+	)
+	publish_clone_progress(progress, len(items))
+
+	clear_sidebar_cache(wiki_space.name)
+	rebuild_navigation(wiki_space.name)
+	bump_cache_version(SPACES)
+	build_index_in_background()
+	backfill_artifacts_in_background()
+
+	return wiki_space
+
+
+def rewrite_route(page_route: str, route: str, new_space_route: str) -> str:
+	if page_route == route or page_route.startswith(f"{route}/"):
+		return new_space_route + page_route[len(route) :]
+
+	return page_route.replace(route, new_space_route, 1)
+
+
+def clone_revision_items(clones: dict, progress: frappe._dict):
+	"""Point every revision of the original pages at their clones too"""
+	rows = frappe.db.sql(
+		"""
+		SELECT item.parent, item.wiki_page
+		FROM `tabWiki Page Revision Item` item
+		INNER JOIN `tabWiki Page Revision` revision ON revision.name = item.parent
+		WHERE item.wiki_page IN %(pages)s AND item.parenttype = 'Wiki Page Revision'
+		ORDER BY revision.creation
+		""",
+		{"pages": list(clones) or [""]},
+		as_dict=True,
+	)
+
+	last_idx = dict(
+		frappe.db.sql(
+			"""
+			SELECT parent, MAX(idx)
+			FROM `tabWiki Page Revision Item`
+			WHERE parent IN %(revisions)s AND parenttype = 'Wiki Page Revision'
+			GROUP BY parent
+			""",
+			{"revisions": list({row.parent for row in rows}) or [""]},
+		)
+	)
+
+	now = frappe.utils.now()
+	values = []
+	for row in rows:
+		last_idx[row.parent] = (last_idx.get(row.parent) or 0) + 1
+		values.append(
+			[
+				frappe.generate_hash(),
+				now,
+				now,
+				frappe.session.user,
+				frappe.session.user,
+				row.parent,
+				"Wiki Page Revision",
+				"wiki_pages",
+				last_idx[row.parent],
+				clones[row.wiki_page].name,
+			]
+		)
+
+	for batch in create_batch(values, BATCH_SIZE * 10):
+		frappe.db.bulk_insert(
+			"Wiki Page Revision Item",
+			[
+				"name",
+				"creation",
+				"modified",
+				"owner",
+				"modified_by",
+				"parent",
+				"parenttype",
+				"parentfield",
+				"idx",
+				"wiki_page",
+			],
+			batch,
+		)
+
+	publish_clone_progress(progress, len(clones))
+
+
+def publish_clone_progress(progress: frappe._dict, count: int):
+	progress.done += count
+	frappe.publish_progress(
+		progress.done * 100 / (progress.total or 1),
+		title=_("Cloning into new Wiki Space <b>{0}</b>").format(progress.route),
+		description=f"{progress.done}/{progress.total}",
+	)
@@ -0,0 +1,227 @@
+# Copyright (c) 2026, Frappe and contributors
+# For license information, please see license.txt
+
+import hashlib
+import json
+import re
+import shutil
+from pathlib import Path
+
+import frappe
+from frappe.utils import update_progress_bar
+
+from wiki.wiki.doctype.wiki_page_artifact.wiki_page_artifact import get_artifacts
+
+MANIFEST_FILE = ".wiki-export.json"
+SEARCH_BUNDLE_FILE = "search.json"
+ASSET_DIRS = ("frappe/dist", "frappe/images", "wiki/dist", "wiki/images")
+FILE_URL_PATTERN = re.compile(r"""(?:src|href)=["'](/files/[^"'?#]+)""")
+
+
+def export_wiki_space(space: str, target: str, include_assets: bool = True, force: bool = False) -> dict:
+	"""
+	Render every guest visible page of `space` to `target/<route>/index.html`
+	using the live WikiPageRenderer templates, along with a search bundle,
+	the built assets and the files the pages refer to. Exported pages follow
+	links with full page loads and search the bundle, there is no API to call.
+
+	Pages are only rewritten when their content or the navigation of the
+	space (sidebar, next/prev, settings) changed since the last export.
+	"""
+	space = frappe.get_doc("Wiki Space", frappe.db.get_value("Wiki Space", {"route": space}) or space)
+	target = Path(target).absolute()
+	target.mkdir(parents=True, exist_ok=True)
+
+	manifest, exported_space_route = _read_manifest(target)
+	pages = get_exportable_pages(space.name)
+	artifacts = get_artifacts(pages)
+	navigation = get_navigation_fingerprint(space, pages)
+
+	stats = frappe._dict(written=0, unchanged=0, removed=0)
+	exported = {}
+
+	# pages are rendered the way a guest sees them
+	user = frappe.session.user
+	try:
+		for i, page in enumerate(pages):
+			fingerprint = hashlib.sha256(
+				f"{artifacts[page.name].content_hash}:{page.modified}:{navigation}".encode()
+			).hexdigest()
+			path = target / page.route / "index.html"
+
+			if not force and manifest.get(page.name, {}).get("fingerprint") == fingerprint and path.exists():
+				stats.unchanged += 1
+			else:
+				path.parent.mkdir(parents=True, exist_ok=True)
+				path.write_text(render_page(page.route, space.route))
+				stats.written += 1
+
+			exported[page.name] = {"route": page.route, "fingerprint": fingerprint}
+			update_progress_bar(f"Exporting Wiki Space {space.route}", i, len(pages))
+	finally:
+		frappe.set_user(user)
+		frappe.flags.wiki_full_sidebar = False
+
+	# pages that are gone or moved, unless another page took over their route
+	routes = {entry["route"] for entry in exported.values()}
+	for name, entry in manifest.items():
+		if exported.get(name, {}).get("route") != entry["route"] and entry["route"] not in routes:
+			remove_page(target, entry["route"])
+			stats.removed += 1
+
+	if exported_space_route and (exported_space_route != space.route or not pages):
+		remove_space_files(target, exported_space_route)
+
+	if pages:
+		write_space_index(target, space.route, pages[0].route)
+		write_search_bundle(target, space.route, pages, artifacts)
+
+	if include_assets:
+		copy_assets(target)
+		copy_files(target, [page.route for page in pages])
+
+	_write_manifest(target, space.route, exported)
+
+	return stats
+
+
+def get_exportable_pages(space_name: str) -> list[frappe._dict]:
+	pages = frappe.get_all(
+		"Wiki Group Item",
+		fields=[
+			"wiki_page as name",
+			"wiki_page.title as title",
+			"wiki_page.content as content",
+			"wiki_page.route as route",
+			"wiki_page.modified as modified",
+			"wiki_page.published as published",
+			"wiki_page.allow_guest as allow_guest",
+		],
+		filters={"parent": space_name, "parenttype": "Wiki Space"},
+		order_by="idx asc",
+	)
+
+	return [page for page in pages if page.published and page.allow_guest]
+
+
+def get_navigation_fingerprint(space, pages: list) -> str:
+	"""Changes whenever anything rendered around the page content changes"""
+	sidebar = [(d.wiki_page, d.parent_label, d.hide_on_sidebar) for d in space.wiki_sidebars]
+	titles = [(page.name, page.title, page.route) for page in pages]
+	settings_modified = frappe.db.get_single_value("Wiki Settings", "modified")
+
+	return hashlib.sha256(
+		json.dumps([sidebar, titles, str(space.modified), str(settings_modified)]).encode()
+	).hexdigest()
+
+
+def render_page(route: str, space_route: str) -> str:
+	from frappe.utils import set_request
+	from frappe.website.serve import get_response_content
+
+	frappe.set_user("Guest")
+	# there is no API to fetch collapsed sidebar groups from
+	frappe.flags.wiki_full_sidebar = True
+	frappe.local.response = frappe._dict({"docs": []})
+	set_request(method="GET", path=f"/{route}")
+
+	html = get_response_content(route)
+
+	# tells wiki.js to leave navigation to the browser and to search the bundle
+	marker = f'<meta name="wiki-static-export" content="/{space_route}/{SEARCH_BUNDLE_FILE}">'
+	return html.replace("</head>", f"{marker}</head>", 1)
+
+
+def remove_page(target: Path, route: str):
+	"""Remove an exported page, keeping pages nested under its route"""
+	_remove_file(target, target / route / "index.html")
+
+
+def remove_space_files(target: Path, space_route: str):
+	"""Remove the index and search bundle of a space exported under another route"""
+	for file_name in ("index.html", SEARCH_BUNDLE_FILE):
+		_remove_file(target, target / space_route / file_name)
+
+
+def _remove_file(target: Path, path: Path):
+	path.unlink(missing_ok=True)
+
+	directory = path.parent
+	while directory != target and directory.is_dir() and not any(directory.iterdir()):
+		directory.rmdir()
+		directory = directory.parent
+
+
+def write_space_index(target: Path, space_route: str, first_page_route: str):
+	"""nginx serves the space route as a directory, point it at the first page"""
+	index = target / space_route / "index.html"
+	index.parent.mkdir(parents=True, exist_ok=True)
+	index.write_text(
+		f'<!DOCTYPE html><meta http-equiv="refresh" content="0; url=/{first_page_route}">'
+		f'<link rel="canonical" href="/{first_page_route}">'
+	)
+
+
+def write_search_bundle(target: Path, space_route: str, pages: list, artifacts: dict):
+	bundle = [
+		{
+			"name": page.name,
+			"title": page.title,
+			"route": page.route,
+			"content": artifacts[page.name].plain_text,
+		}
+		for page in pages
+	]
+
+	search_bundle = target / space_route / SEARCH_BUNDLE_FILE
+	search_bundle.parent.mkdir(parents=True, exist_ok=True)
+	search_bundle.write_text(json.dumps(bundle))
+
+
+def copy_assets(target: Path):
+	assets_path = Path(frappe.local.sites_path) / "assets"
+	for asset_dir in ASSET_DIRS:
+		source = assets_path / asset_dir
+		if source.exists():
+			shutil.copytree(
+				source,
+				target / "assets" / asset_dir,
+				dirs_exist_ok=True,
+				ignore=shutil.ignore_patterns("node_modules"),
+			)
+
+
+def copy_files(target: Path, routes: list[str]):
+	"""Copy public files referenced from the exported pages"""
+	file_urls = set()
+	for route in routes:
+		file_urls.update(FILE_URL_PATTERN.findall((target / route / "index.html").read_text()))
+
+	for file_url in file_urls:
+		source = Path(frappe.get_site_path("public", file_url.lstrip("/")))
+		destination = target / file_url.lstrip("/")
+
+		if not source.is_file():
+			continue
+
+		if destination.exists() and destination.stat().st_size == source.stat().st_size:
+			continue
+
+		destination.parent.mkdir(parents=True, exist_ok=True)
+		shutil.copy2(source, destination)
+
+
+def _read_manifest(target: Path) -> tuple[dict, str | None]:
+	"""Pages of the last export and the route their space was exported under"""
+	manifest = target / MANIFEST_FILE
+	if not manifest.exists():
+		return {}, None
+
+	manifest = json.loads(manifest.read_text())
+	return manifest.get("pages", {}), manifest.get("space")
+
+
+def _write_manifest(target: Path, space_route: str, pages: dict):
+	(target / MANIFEST_FILE).write_text(
+		json.dumps({"site": frappe.local.site, "space": space_route, "pages": pages}, indent=1)
+	)
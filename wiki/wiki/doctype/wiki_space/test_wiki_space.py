@@ -1,9 +1,225 @@
 # Copyright (c) 2023, Frappe and Contributors
 # See license.txt
 
-# import frappe
+import json
+import shutil
+import tempfile
+from pathlib import Path
+
+import frappe
 from frappe.tests.utils import FrappeTestCase
+from frappe.utils import set_request
+
+from wiki.cache import clear_website_cache
+from wiki.wiki.doctype.wiki_page.sidebar import (
+	GUEST,
+	USER,
+	get_sidebar_group,
+	get_sidebar_tree,
+	reorder_sidebar_items,
+)
+from wiki.wiki.doctype.wiki_page.wiki_renderer import WikiPageRenderer
+from wiki.wiki.doctype.wiki_space.clone import clone_wiki_space
+from wiki.wiki.doctype.wiki_space.static_export import export_wiki_space
 
 
 class TestWikiSpace(FrappeTestCase):
-	pass
+	def test_clone_wiki_space(self):
+		space = frappe.get_doc({"doctype": "Wiki Space", "route": "test-clone-v1"}).insert()
+		page = space.wiki_sidebars[0].wiki_page
+
+		clone = clone_wiki_space(space.name, space.route, "test-clone-v2")
+
+		items = frappe.get_all("Wiki Group Item", {"parent": clone.name}, ["wiki_page", "parent_label"])
+		self.assertEqual([item.parent_label for item in items], ["New Group"])
+
+		cloned_page = frappe.get_doc("Wiki Page", items[0].wiki_page)
+		self.assertEqual(cloned_page.route, "test-clone-v2/new-wiki-page")
+		self.assertEqual(cloned_page.content, frappe.db.get_value("Wiki Page", page, "content"))
+		self.assertEqual(
+			frappe.get_all("Wiki Page Revision Item", {"wiki_page": cloned_page.name}, pluck="parent"),
+			frappe.get_all("Wiki Page Revision Item", {"wiki_page": page}, pluck="parent"),
+		)
+
+		with self.assertRaises(frappe.ValidationError):
+			clone_wiki_space(space.name, space.route, "test-clone-v2")
+
+		for wiki_space in (clone, space):
+			for item in frappe.get_all("Wiki Group Item", {"parent": wiki_space.name}, pluck="wiki_page"):
+				frappe.delete_doc("Wiki Page", item)
+			frappe.delete_doc("Wiki Space", wiki_space.name)
+
+	def test_reorder_sidebar_writes_changed_rows(self):
+		space = frappe.get_doc({"doctype": "Wiki Space", "route": "test-reorder"}).insert()
+		first = space.wiki_sidebars[0].wiki_page
+		second = frappe.get_doc(
+			{"doctype": "Wiki Page", "route": "test-reorder/second", "title": "Second", "content": "Second"}
+		).insert()
+		space.append("wiki_sidebars", {"wiki_page": second.name, "parent_label": "New Group"})
+		space.save()
+
+		sidebars = {"New Group": [{"name": second.name}], "Other Group": [{"name": first}]}
+		self.assertEqual(reorder_sidebar_items(sidebars), 2)
+		self.assertEqual(reorder_sidebar_items(sidebars), 0)
+
+		items = frappe.get_all(
+			"Wiki Group Item", {"parent": space.name}, ["wiki_page", "parent_label"], order_by="idx asc"
+		)
+		self.assertEqual(
+			[(item.wiki_page, item.parent_label) for item in items],
+			[(second.name, "New Group"), (first, "Other Group")],
+		)
+
+		for page in (first, second.name):
+			frappe.delete_doc("Wiki Page", page)
+		frappe.delete_doc("Wiki Space", space.name)
+
+	def test_static_export(self):
+		space = frappe.get_doc({"doctype": "Wiki Space", "route": "test-export"}).insert()
+		first = space.wiki_sidebars[0].wiki_page
+		frappe.db.set_value("Wiki Page", first, "allow_guest", 1)
+		second = frappe.get_doc(
+			{
+				"doctype": "Wiki Page",
+				"route": "test-export/second",
+				"title": "Second",
+				"content": "Exported searchable text",
+				"published": 1,
+				"allow_guest": 1,
+			}
+		).insert()
+		space.append("wiki_sidebars", {"wiki_page": second.name, "parent_label": "New Group"})
+		space.save()
+
+		target = Path(tempfile.mkdtemp())
+		try:
+			stats = export_wiki_space(space.route, target, include_assets=False)
+			self.assertEqual((stats.written, stats.unchanged, stats.removed), (2, 0, 0))
+			self.assertEqual(frappe.session.user, "Administrator")
+
+			html = (target / "test-export/second/index.html").read_text()
+			self.assertIn('<meta name="wiki-static-export" content="/test-export/search.json">', html)
+			self.assertNotIn("data-lazy", html)
+
+			bundle = json.loads((target / "test-export/search.json").read_text())
+			self.assertEqual(
+				[(page["route"], page["content"]) for page in bundle if page["name"] == second.name],
+				[("test-export/second", "Exported searchable text")],
+			)
+
+			# nothing changed, every page is skipped
+			stats = export_wiki_space(space.route, target, include_assets=False)
+			self.assertEqual((stats.written, stats.unchanged, stats.removed), (0, 2, 0))
+
+			# moved pages leave nothing behind at their old route
+			frappe.db.set_value("Wiki Page", second.name, "route", "test-export/moved")
+			stats = export_wiki_space(space.route, target, include_assets=False)
+			self.assertEqual((stats.written, stats.removed), (1, 1))
+			self.assertFalse((target / "test-export/second").exists())
+			self.assertTrue((target / "test-export/moved/index.html").exists())
+
+			# so do the space index and the search bundle when the space moves
+			frappe.db.set_value("Wiki Space", space.name, "route", "test-export-moved")
+			space.reload()
+			export_wiki_space(space.route, target, include_assets=False)
+			self.assertFalse((target / "test-export/search.json").exists())
+			self.assertFalse((target / "test-export/index.html").exists())
+			self.assertTrue((target / "test-export-moved/search.json").exists())
+
+			# pages guests can't see anymore are removed from the export and the bundle
+			frappe.db.set_value("Wiki Page", second.name, "allow_guest", 0)
+			stats = export_wiki_space(space.route, target, include_assets=False)
+			self.assertEqual(stats.removed, 1)
+			self.assertFalse((target / "test-export/moved").exists())
+			bundle = json.loads((target / "test-export-moved/search.json").read_text())
+			self.assertEqual([page["name"] for page in bundle], [first])
+		finally:
+			shutil.rmtree(target)
+			for page in (first, second.name):
+				frappe.delete_doc("Wiki Page", page)
+			frappe.delete_doc("Wiki Space", space.name)
+
+	def test_sidebar_group_must_exist(self):
+		space = frappe.get_doc({"doctype": "Wiki Space", "route": "test-sidebar-group"}).insert()
+
+		self.assertEqual(get_sidebar_group(space.name, "New Group").status_code, 200)
+		for space_name, group in ((space.name, "Missing Group"), ("missing-space", "New Group")):
+			with self.assertRaises(frappe.DoesNotExistError):
+				get_sidebar_group(space_name, group)
+
+		frappe.delete_doc("Wiki Page", space.wiki_sidebars[0].wiki_page)
+		frappe.delete_doc("Wiki Space", space.name)
+
+	def test_sidebar_tree_per_audience(self):
+		space = frappe.get_doc({"doctype": "Wiki Space", "route": "test-audience"}).insert()
+		private_page = space.wiki_sidebars[0].wiki_page
+		guest_page = frappe.get_doc(
+			{
+				"doctype": "Wiki Page",
+				"route": "test-audience/guest",
+				"title": "Guest",
+				"content": "Guest",
+				"published": 1,
+				"allow_guest": 1,
+			}
+		).insert()
+		space.append("wiki_sidebars", {"wiki_page": guest_page.name, "parent_label": "New Group"})
+		space.save()
+
+		def pages(audience):
+			return [item["name"] for item in get_sidebar_tree(space.name, audience)["New Group"]]
+
+		self.assertEqual(pages(USER), [private_page, guest_page.name])
+		self.assertEqual(pages(GUEST), [guest_page.name])
+
+		for page in (private_page, guest_page.name):
+			frappe.delete_doc("Wiki Page", page)
+		frappe.delete_doc("Wiki Space", space.name)
+
+	def test_guest_page_cached_fully_assembled(self):
+		space = frappe.get_doc({"doctype": "Wiki Space", "route": "test-render"}).insert()
+		page = frappe.get_doc("Wiki Page", space.wiki_sidebars[0].wiki_page)
+		page.allow_guest = 1
+		page.save()
+
+		def render(etag=None, full_sidebar=False):
+			frappe.flags.wiki_full_sidebar = full_sidebar
+			frappe.local.response = frappe._dict({"docs": []})
+			set_request(method="GET", path=f"/{page.route}", headers={"If-None-Match": etag} if etag else {})
+			renderer = WikiPageRenderer(path=page.route)
+			self.assertTrue(renderer.can_render())
+			return renderer, renderer.render()
+
+		conf = {key: frappe.conf.get(key) for key in ("developer_mode", "disable_website_cache")}
+		frappe.conf.update(developer_mode=0, disable_website_cache=0)
+		frappe.set_user("Guest")
+		try:
+			renderer, response = render()
+			self.assertEqual(response.status_code, 200)
+			etag = response.headers["ETag"]
+			self.assertIn("Surrogate-Key", response.headers)
+
+			cached = renderer.get_cached_response(etag.strip('"'))
+			self.assertEqual(cached.get_data(), response.get_data())
+
+			self.assertEqual(render(etag)[1].status_code, 304)
+
+			# static exports render a full sidebar, they never share a cached page with live visits
+			response = render(etag, full_sidebar=True)[1]
+			self.assertEqual(response.status_code, 200)
+			self.assertNotEqual(response.headers["ETag"], etag)
+
+			# the navbar and footer come from Website Settings
+			self.assertNotIn("Last-Modified", response.headers)
+			clear_website_cache()
+			response = render(etag)[1]
+			self.assertEqual(response.status_code, 200)
+			self.assertNotEqual(response.headers["ETag"], etag)
+		finally:
+			frappe.set_user("Administrator")
+			frappe.flags.wiki_full_sidebar = False
+			frappe.local.request = None
+			frappe.conf.update(conf)
+
+		frappe.delete_doc("Wiki Page", page.name)
+		frappe.delete_doc("Wiki Space", space.name)
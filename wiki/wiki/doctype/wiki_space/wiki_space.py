@@ -3,16 +3,23 @@
 import json
 
 import frappe
-import pymysql
+from frappe import _
 from frappe.model.document import Document
 
+from wiki.cache import SPACES, bump_cache_version, page_key, run_deferred
 from wiki.wiki.doctype.wiki_page.search import build_index_in_background, drop_index
+from wiki.wiki.doctype.wiki_page.sidebar import clear_sidebar_cache, rebuild_navigation, reorder_sidebar_items
+from wiki.wiki.doctype.wiki_route_redirect.wiki_route_redirect import add_route_redirects
+from wiki.wiki.doctype.wiki_space.clone import clone_wiki_space, rewrite_route
+
+# spaces with more pages than this get their page routes updated in a background job
+ROUTE_REWRITE_BACKGROUND_THRESHOLD = 500
 
 
 class WikiSpace(Document):
 	def before_insert(self):
-		# insert a new wiki page when sidebar is empty
-		if not self.wiki_sidebars:
+		# insert a new wiki page when sidebar is empty, clones get their sidebar after insert
+		if not self.wiki_sidebars and not self.flags.in_clone:
 			wiki_page = frappe.get_doc(
 				{
 					"doctype": "Wiki Page",
@@ -41,41 +48,43 @@ class WikiSpace(Document):
 		if not old_route or self.route == old_route:
 			return
 
-		for i, wiki_sidebar in enumerate(self.wiki_sidebars):
-			wiki_page = frappe.get_value("Wiki Page", wiki_sidebar.wiki_page, ["name", "route"], as_dict=1)
-			wiki_page_route = wiki_page.route.replace(old_route, self.route, 1)
-
-			frappe.publish_progress(
-				percent=i * 100 / len(self.wiki_sidebars),
-				title=f"Updating Wiki Page routes - <b>{self.route}</b>",
-				description=f"{i}/{len(self.wiki_sidebars)}",
+		pages = get_pages_to_move(self.name, old_route)
+		moves = {page.name: rewrite_route(page.route, old_route, self.route) for page in pages}
+
+		# pages of other spaces already living at the new routes, checked before anything is written
+		if taken := frappe.get_all(
+			"Wiki Page",
+			filters={"route": ["in", list(moves.values()) or [""]], "name": ["not in", list(moves) or [""]]},
+			pluck="route",
+		):
+			frappe.throw(_("Wiki Page with route <b>{0}</b> already exists.").format(", ".join(taken)))
+
+		if len(pages) > ROUTE_REWRITE_BACKGROUND_THRESHOLD:
+			frappe.enqueue(
+				update_page_routes,
+				queue="long",
+				enqueue_after_commit=True,
+				now=frappe.flags.in_test,
+				space=self.name,
+				old_route=old_route,
+				new_route=self.route,
 			)
-
-			try:
-				if wiki_page_route:
-					frappe.db.set_value(
-						"Wiki Page",
-						wiki_sidebar.wiki_page,
-						"route",
-						wiki_page_route,
-					)
-			except Exception as e:
-				if isinstance(e, pymysql.err.IntegrityError):
-					frappe.throw(f"Wiki Page with route <b>{wiki_page.route}</b> already exists.")
-				else:
-					raise e
+			frappe.msgprint(_("Routes of the pages of this space are being updated in the background"))
+		else:
+			update_page_routes(self.name, old_route, self.route)
 
 	def on_update(self):
-		build_index_in_background()
+		run_deferred("build_index", build_index_in_background)
 
-		# clear sidebar cache
-		frappe.cache().hdel("wiki_sidebar", self.name)
+		clear_sidebar_cache(self.name)
+		rebuild_navigation(self.name)
+		bump_cache_version(SPACES)
 
 	def on_trash(self):
 		drop_index()
 
-		# clear sidebar cache
-		frappe.cache().hdel("wiki_sidebar", self.name)
+		clear_sidebar_cache(self.name)
+		bump_cache_version(SPACES)
 		build_index_in_background()
 
 	@frappe.whitelist()
@@ -89,53 +98,53 @@ class WikiSpace(Document):
 		)
 
 
-def clone_wiki_space(name, route, new_space_route):
-	if frappe.db.exists("Wiki Space", new_space_route):
-		frappe.throw(f"Wiki Space <b>{new_space_route}</b> already exists.")
-
-	items = frappe.get_all(
-		"Wiki Group Item",
-		filters={"parent": name},
-		fields=["wiki_page", "parent_label"],
-		order_by="idx asc",
+def get_pages_to_move(space: str, old_route: str) -> list[dict]:
+	"""Pages of `space` living under `old_route`"""
+	return frappe.db.sql(
+		"""
+		SELECT page.name, page.route
+		FROM `tabWiki Page` page
+		INNER JOIN `tabWiki Group Item` item ON item.wiki_page = page.name AND item.parenttype = 'Wiki Space'
+		WHERE item.parent = %(space)s AND (page.route = %(route)s OR LEFT(page.route, %(length)s) = %(prefix)s)
+		""",
+		{"space": space, "route": old_route, "prefix": f"{old_route}/", "length": len(old_route) + 1},
+		as_dict=True,
 	)
 
-	cloned_wiki_space = frappe.new_doc("Wiki Space")
-	cloned_wiki_space.route = new_space_route
 
-	for idx, item in enumerate(items, 1):
-		frappe.publish_progress(
-			idx * 100 / len(items),
-			title=f"Cloning into new Wiki Space <b>{new_space_route}</b>",
-			description=f"{idx}/{len(items)}",
-		)
-		cloned_doc = frappe.get_doc("Wiki Page", item.wiki_page).clone(route, new_space_route)
-		cloned_wiki_space.append(
-			"wiki_sidebars",
-			{
-				"wiki_page": cloned_doc.name,
-				"parent_label": item.parent_label,
-			},
-		)
-
-	cloned_wiki_space.insert()
+def update_page_routes(space: str, old_route: str, new_route: str):
+	"""Move every page of `space` from `old_route` to `new_route` with one UPDATE, leaving redirects behind"""
+	moves = {
+		page.name: (page.route, rewrite_route(page.route, old_route, new_route))
+		for page in get_pages_to_move(space, old_route)
+	}
+	if not moves:
+		return
+
+	frappe.db.sql(
+		"""
+		UPDATE `tabWiki Page` page
+		INNER JOIN `tabWiki Group Item` item ON item.wiki_page = page.name AND item.parenttype = 'Wiki Space'
+		SET page.route = CONCAT(%(new_route)s, SUBSTRING(page.route, %(start)s))
+		WHERE item.parent = %(space)s AND (page.route = %(route)s OR LEFT(page.route, %(length)s) = %(prefix)s)
+		""",
+		{
+			"space": space,
+			"route": old_route,
+			"prefix": f"{old_route}/",
+			"length": len(old_route) + 1,
+			"new_route": new_route,
+			"start": len(old_route) + 1,
+		},
+	)
+	add_route_redirects(moves)
 
-	return cloned_wiki_space
+	clear_sidebar_cache(space)
+	rebuild_navigation(space)
+	bump_cache_version(*(page_key(page) for page in moves))
+	run_deferred("build_index", build_index_in_background)
 
 
 @frappe.whitelist()
 def update_sidebar(sidebar_items):
-	sidebars = json.loads(sidebar_items)
-
-	sidebar_items = sidebars.items()
-	if sidebar_items:
-		idx = 0
-		for sidebar, items in sidebar_items:
-			for item in items:
-				idx += 1
-				frappe.db.set_value(
-					"Wiki Group Item", {"wiki_page": str(item["name"])}, {"parent_label": sidebar, "idx": idx}
-				)
-
-	for key in frappe.cache().hgetall("wiki_sidebar").keys():
-		frappe.cache().hdel("wiki_sidebar", key)
+	reorder_sidebar_items(json.loads(sidebar_items))
@@ -3,9 +3,10 @@
 
 import frappe
 import requests
-from bs4 import BeautifulSoup
 from frappe import _
 
+from wiki.wiki.doctype.wiki_page_artifact.wiki_page_artifact import extract_links, get_artifacts
+
 
 def execute(filters: dict | None = None):
 	"""Return columns and data for the report.
@@ -50,21 +51,23 @@ def get_data(filters: dict | None = None) -> list[list]:
 	"""
 	data = []
 
-	wiki_pages = frappe.db.get_all("Wiki Page", fields=["name", "content"])
-
 	if filters and filters.get("wiki_space"):
 		wiki_space = filters.get("wiki_space")
 		wiki_pages = frappe.db.get_all(
 			"Wiki Group Item",
-			fields=["wiki_page as name", "wiki_page.content as content"],
+			fields=["wiki_page as name", "wiki_page.title as title", "wiki_page.content as content"],
 			filters={"parent": wiki_space, "parenttype": "Wiki Space"},
 		)
+	else:
+		wiki_pages = frappe.db.get_all("Wiki Page", fields=["name", "title", "content"])
 
 	include_images = filters and bool(filters.get("check_images"))
 	check_internal_links = filters and bool(filters.get("check_internal_links"))
 
+	artifacts = get_artifacts(wiki_pages)
+
 	for page in wiki_pages:
-		broken_links_for_page = get_broken_links(page.content, include_images, check_internal_links)
+		broken_links_for_page = check_links(artifacts[page.name].links, include_images, check_internal_links)
 		rows = [{"broken_link": link, "wiki_page": page["name"]} for link in broken_links_for_page]
 		data.extend(rows)
 
@@ -75,15 +78,19 @@ def get_broken_links(
 	md_content: str, include_images: bool = True, include_relative_urls: bool = False
 ) -> list[str]:
 	html = frappe.utils.md_to_html(md_content)
-	soup = BeautifulSoup(html, "html.parser")
+	return check_links(extract_links(html), include_images, include_relative_urls)
 
-	links = soup.find_all("a")
-	if include_images:
-		links += soup.find_all("img")
 
+def check_links(
+	links: list[dict], include_images: bool = True, include_relative_urls: bool = False
+) -> list[str]:
+	"""Check links as stored on Wiki Page Artifact and return the broken ones"""
 	broken_links = []
-	for el in links:
-		url = el.attrs.get("href") or el.attrs.get("src")
+	for link in links:
+		if link["tag"] == "img" and not include_images:
+			continue
+
+		url = link["url"]
 
 		if not url or is_hash_link(url):
 			continue
@@ -8,6 +8,7 @@ from frappe.utils import cstr, strip_html_tags, update_progress_bar
 from frappe.utils.redis_wrapper import RedisWrapper
 
 from wiki.search import Search
+from wiki.wiki.doctype.wiki_page_artifact.wiki_page_artifact import get_artifacts
 
 UNSAFE_CHARS = re.compile(r"[\[\]{}<>+]")
 
@@ -47,7 +48,7 @@ class WikiSearch(Search):
 		id = f"Wiki Page:{doc.name}"
 		fields = {
 			"title": doc.title,
-			"content": strip_html_tags(doc.content),
+			"content": doc.plain_text or strip_html_tags(doc.content),
 			"route": doc.route,
 			"meta_description": doc.meta_description or "",
 			"meta_keywords": doc.meta_keywords or "",
@@ -72,7 +73,7 @@ class WikiSearch(Search):
 		return query
 
 	def get_records(self):
-		return frappe.get_all(
+		records = frappe.get_all(
 			"Wiki Page",
 			fields=[
 				"name",
@@ -87,3 +88,9 @@ class WikiSearch(Search):
 			],
 			filters={"published": 1},
 		)
+
+		artifacts = get_artifacts(records)
+		for record in records:
+			record.plain_text = artifacts[record.name].plain_text
+
+		return records
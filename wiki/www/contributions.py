@@ -1,7 +1,7 @@
 import frappe
 from frappe import _
-from frappe.utils.data import cint
 
+from wiki.utils import get_patch_listing
 from wiki.wiki.doctype.wiki_page.wiki_page import get_open_drafts
 
 color_map = {
@@ -16,7 +16,7 @@ def get_context(context):
 	context.pilled_title = "My Contributions"
 	context.no_cache = 1
 	context.no_sidebar = 1
-	context.contributions = get_user_contributions(0, 10)
+	context.contributions, context.next_cursor = get_user_contributions(None, 10)
 	context = context.update(
 		{
 			"post_login": [
@@ -34,25 +34,21 @@ def get_context(context):
 
 
 @frappe.whitelist()
-def get_contributions(start, limit):
-	return {"contributions": get_user_contributions(start, limit)}
-
-
-def get_user_contributions(start, limit):
-	contributions = []
-	wiki_page_patches = frappe.get_list(
-		"Wiki Page Patch",
-		["message", "status", "name", "wiki_page", "modified", "new"],
-		order_by="modified desc",
-		start=cint(start),
-		limit=cint(limit),
-		filters=[["status", "!=", "Draft"], ["owner", "=", frappe.session.user]],
+def get_contributions(cursor=None, limit=10):
+	contributions, next_cursor = get_user_contributions(cursor, limit)
+	return {"contributions": contributions, "next_cursor": next_cursor}
+
+
+def get_user_contributions(cursor, limit):
+	patch = frappe.qb.DocType("Wiki Page Patch")
+	contributions, next_cursor = get_patch_listing(
+		[patch.status != "Draft", patch.owner == frappe.session.user], cursor, limit
 	)
-	for wiki_page_patch in wiki_page_patches:
-		route = frappe.db.get_value("Wiki Page", wiki_page_patch.wiki_page, "route")
-		wiki_page_patch.edit_link = f"/{route}?editWiki=1&wikiPagePatch={wiki_page_patch.name}"
+	for wiki_page_patch in contributions:
+		wiki_page_patch.edit_link = (
+			f"/{wiki_page_patch.route}?editWiki=1&wikiPagePatch={wiki_page_patch.name}"
+		)
 		wiki_page_patch.color = color_map[wiki_page_patch.status]
 		wiki_page_patch.modified = frappe.utils.pretty_date(wiki_page_patch.modified)
-		contributions.extend([wiki_page_patch])
 
-	return contributions
+	return contributions, next_cursor
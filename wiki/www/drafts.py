@@ -1,7 +1,7 @@
 import frappe
 from frappe import _
-from frappe.utils.data import cint
 
+from wiki.utils import get_patch_listing
 from wiki.wiki.doctype.wiki_page.wiki_page import get_open_contributions
 
 
@@ -9,7 +9,7 @@ def get_context(context):
 	context.pilled_title = "My Drafts"
 	context.no_cache = 1
 	context.no_sidebar = 1
-	context.contributions = get_user_drafts(0, 10)
+	context.contributions, context.next_cursor = get_user_drafts(None, 10)
 	context = context.update(
 		{
 			"post_login": [
@@ -27,30 +27,27 @@ def get_context(context):
 
 
 @frappe.whitelist()
-def get_drafts(start, limit):
-	return {"contributions": get_user_drafts(start, limit)}
-
-
-def get_user_drafts(start, limit):
-	drafts = []
-	wiki_page_patches = frappe.get_list(
-		"Wiki Page Patch",
-		["message", "status", "name", "wiki_page", "modified", "new", "new_sidebar_group"],
-		order_by="modified desc",
-		start=cint(start),
-		limit=cint(limit),
-		filters=[["status", "=", "Draft"], ["owner", "=", frappe.session.user]],
+def get_drafts(cursor=None, limit=10):
+	drafts, next_cursor = get_user_drafts(cursor, limit)
+	return {"contributions": drafts, "next_cursor": next_cursor}
+
+
+def get_user_drafts(cursor, limit):
+	patch = frappe.qb.DocType("Wiki Page Patch")
+	drafts, next_cursor = get_patch_listing(
+		[patch.status == "Draft", patch.owner == frappe.session.user],
+		cursor,
+		limit,
+		fields=("new_sidebar_group",),
 	)
-	for wiki_page_patch in wiki_page_patches:
-		route = frappe.db.get_value("Wiki Page", wiki_page_patch.wiki_page, "route")
+	for wiki_page_patch in drafts:
 		if wiki_page_patch.new:
+			wiki_page_patch.edit_link = f"/{wiki_page_patch.route}?newWiki={wiki_page_patch.new_sidebar_group}&wikiPagePatch={wiki_page_patch.name}"
+		else:
 			wiki_page_patch.edit_link = (
-				f"/{route}?newWiki={wiki_page_patch.new_sidebar_group}&wikiPagePatch={wiki_page_patch.name}"
+				f"/{wiki_page_patch.route}?editWiki=1&wikiPagePatch={wiki_page_patch.name}"
 			)
-		else:
-			wiki_page_patch.edit_link = f"/{route}?editWiki=1&wikiPagePatch={wiki_page_patch.name}"
 		wiki_page_patch.color = "orange"
 		wiki_page_patch.modified = frappe.utils.pretty_date(wiki_page_patch.modified)
-		drafts.extend([wiki_page_patch])
 
-	return drafts
+	return drafts, next_cursor
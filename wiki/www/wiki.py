@@ -4,11 +4,13 @@
 
 import frappe
 
+from wiki.snapshot import get_wiki_snapshot
+
 
 def get_context(context):
 	"""Find and route to the default wiki space's route, which will further route to it's first wiki page"""
 
-	default_space_route = frappe.get_single("Wiki Settings").default_wiki_space
+	default_space_route = get_wiki_snapshot().settings.default_wiki_space
 
 	if default_space_route:
 		frappe.response.location = f"/{default_space_route}"